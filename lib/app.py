@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 import commands
 import click
+from models.connection import configure
 
 @click.group()
-def cli():
+@click.option('--db', default=None, envvar='HOTEL_DB_PATH', help='Path of the SQLite database file.')
+def cli(db=None):
     '''This function is a click group designated to hold all of the click commands under one entity.'''
-    pass
+    if db:
+        configure(db)
 
 @cli.command()
 def menu():
+    commands.clear_history_cli()
     commands.menu()
     
 @cli.command()
@@ -27,14 +31,18 @@ def update_hotel(id: int = None, name:str = None, location: str = None):
 
 @cli.command()
 @click.option('--id', default=None, help='ID of hotel to delete.')
-def delete_hotel(id:int = None):
-    """Delete a hotel by ID."""
-    commands.delete_hotel(id)
+@click.option('--cascade', is_flag=True, default=False, help='Delete the guests of the hotel without asking.')
+@click.option('--restrict', is_flag=True, default=False, help='Refuse to delete a hotel that still has guests.')
+def delete_hotel(id:int = None, cascade:bool = False, restrict:bool = False):
+    """Delete a hotel by ID, along with its guests once confirmed."""
+    commands.delete_hotel(id, cascade, restrict)
 
 @cli.command()
-def display_all_hotels():
+@click.option('--limit', default=None, help='Number of hotels per page.')
+@click.option('--after', default=None, help='List the hotels after this hotel ID.')
+def display_all_hotels(limit=None, after=None):
     """Display all hotels."""
-    commands.display_all_hotels()
+    commands.display_all_hotels(limit, after)
     
 @cli.command()
 @click.option('--name', default=None, help='Name of hotel name to search.')
@@ -70,9 +78,11 @@ def delete_guest(id=None):
     commands.delete_guest(id)
     
 @cli.command()
-def display_all_guests():
+@click.option('--limit', default=None, help='Number of guests per page.')
+@click.option('--after', default=None, help='List the guests after this guest ID.')
+def display_all_guests(limit=None, after=None):
     """Display all guests."""
-    commands.display_all_hotels()
+    commands.display_all_guests(limit, after)
 
 @cli.command()
 @click.option('--id', default=None, help='ID of Guest to find.')
@@ -94,9 +104,11 @@ def search_for_guests_from_one_hotel(id:int=None):
 
 @cli.command()
 @click.option('--length', default=None, help='length of guest name')
-def search_for_guests_by_name_length(length:int=None):
+@click.option('--min-length', default=None, help='minimum length of guest name')
+@click.option('--count', is_flag=True, help='only print the number of matching guests')
+def search_for_guests_by_name_length(length:int=None, min_length:int=None, count:bool=False):
     """Displays all guests whose name is equal to or less than length"""
-    commands.search_for_guests_by_name_length(length)
+    commands.search_for_guests_by_name_length(length, min_length, count)
 
 if __name__ == "__main__":
     cli()
\ No newline at end of file
@@ -0,0 +1,92 @@
+# lib/batch.py
+
+"""Run a stream of model operations without prompts or screen clears.
+
+Every line of the stream is a JSON object naming the operation and its arguments:
+
+    {"op": "create_hotel", "name": "Sonder", "location": "545 Utica Avenue"}
+    {"op": "create_guest", "name": "Raha", "hotel_id": 1}
+    {"op": "update_guest", "id": 1, "name": "Raha Moharrak"}
+    {"op": "search_guests", "text": "raha"}
+
+All operations run in one transaction: the first failing line rolls back the whole batch."""
+
+import json
+import sqlite3
+import time
+from collections import Counter
+from models.guest import Guest
+from models.hotel import Hotel
+from models.transaction import transaction
+
+
+class BatchError(Exception):
+    """An operation of the batch failed, the whole batch was rolled back"""
+
+    def __init__(self, line_number, message):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+
+
+def find(model, id):
+    """Return the model object with primary key id, raising ValueError when there is none"""
+    obj = model.find_by_id(id)
+    if obj is None:
+        raise ValueError(f"No {model.__name__.lower()} with ID {id}")
+    return obj
+
+
+def update_hotel(id, name=None, location=None):
+    hotel = find(Hotel, id)
+    return hotel.update(hotel.name if name is None else name, hotel.location if location is None else location)
+
+
+def update_guest(id, name=None, hotel_id=None):
+    guest = find(Guest, id)
+    return guest.update(guest.name if name is None else name, guest.hotel_id if hotel_id is None else hotel_id)
+
+
+# Operation name -> function run with the remaining keys of the line as keyword arguments.
+# The results of the find_ and search_ operations are echoed
+OPERATIONS = {
+    "create_hotel": Hotel.create,
+    "update_hotel": update_hotel,
+    "delete_hotel": lambda id, mode="keep": find(Hotel, id).delete(mode),
+    "find_hotel": lambda id: find(Hotel, id),
+    "search_hotels": lambda text, limit=20: Hotel.search(text, limit, records=True),
+    "create_guest": Guest.create,
+    "update_guest": update_guest,
+    "delete_guest": lambda id: find(Guest, id).delete(),
+    "find_guest": lambda id: find(Guest, id),
+    "search_guests": lambda text, limit=20: Guest.search(text, limit, records=True, with_hotel=True),
+    "reassign_hotel": Guest.reassign_hotel,
+}
+
+
+def run_batch(lines, echo=None):
+    """ Run the JSON operation of every non-blank line in lines within one transaction.
+    echo, when given, is called with a display line per searched or found entry.
+    Return a summary dictionary with the operation count per operation name, the total and the elapsed seconds"""
+    counts = Counter()
+    start = time.perf_counter()
+    with transaction():
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                arguments = json.loads(line)
+                if not isinstance(arguments, dict):
+                    raise ValueError("every line must be a JSON object")
+                name = arguments.pop("op", None)
+                if name not in OPERATIONS:
+                    raise ValueError(f"unknown operation {name!r}")
+                result = OPERATIONS[name](**arguments)
+            except (ValueError, TypeError, sqlite3.Error) as error:
+                raise BatchError(line_number, error) from error
+
+            if echo and name.startswith(("find_", "search_")):
+                for entry in result if isinstance(result, list) else [result]:
+                    echo(str(entry))
+            counts[name] += 1
+    elapsed = time.perf_counter() - start
+    return {"operations": sum(counts.values()), "counts": dict(counts), "seconds": elapsed}
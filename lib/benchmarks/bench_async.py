@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# lib/benchmarks/bench_async.py
+
+"""Measure Hotel.afind_by_id / Guest.afind_by_name throughput under concurrent requests,
+and the worst event loop stall while they run, against the blocking calls.
+
+Usage: python benchmarks/bench_async.py [request_count] [concurrency]"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the benchmark rows out of lib/hotel.db
+os.environ["HOTEL_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from models.aio import DB_WORKERS, shutdown_executor
+from models.guest import Guest
+from models.hotel import Hotel
+
+
+async def watch_loop(lags, interval=0.001):
+    """Record how late the event loop wakes up a 1ms ticker"""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_async(ids, names, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request(id, name):
+        async with semaphore:
+            await Hotel.afind_by_id(id)
+            await Guest.afind_by_name(name)
+
+    lags = []
+    watcher = asyncio.create_task(watch_loop(lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(request(id, name) for id, name in zip(ids, names)))
+    elapsed = time.perf_counter() - start
+    watcher.cancel()
+    return elapsed, max(lags, default=0.0)
+
+
+def run_blocking(ids, names):
+    start = time.perf_counter()
+    for id, name in zip(ids, names):
+        Hotel.find_by_id(id)
+        Guest.find_by_name(name)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    Hotel.create_table()
+    Guest.create_table()
+    hotels = Hotel.create_many((f"Hotel {i}", f"{i} Main Street") for i in range(1_000))
+    Guest.create_many((f"Guest {i}", hotels[i % len(hotels)].id) for i in range(50_000))
+
+    ids = [random.choice(hotels).id for _ in range(count)]
+    names = [f"Guest {random.randrange(50_000)}" for _ in range(count)]
+
+    blocking = run_blocking(ids, names)
+    elapsed, worst_lag = asyncio.run(run_async(ids, names, concurrency))
+    shutdown_executor()
+
+    print(f"blocking calls               {blocking:8.3f}s  {count / blocking:10,.0f} requests/s")
+    print(f"async, {concurrency:>3} concurrent        {elapsed:8.3f}s  {count / elapsed:10,.0f} requests/s"
+          f"  ({DB_WORKERS} db threads)")
+    print(f"worst event loop stall       {worst_lag * 1000:8.2f}ms")
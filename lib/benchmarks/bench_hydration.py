@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# lib/benchmarks/bench_hydration.py
+
+"""Compare Guest.instance_from_db against hydrating every row through the
+validating Guest constructor, which queries the hotels table once per row.
+
+Usage: python benchmarks/bench_hydration.py [guest_count]"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the benchmark rows out of lib/hotel.db
+os.environ["HOTEL_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from models.connection import get_connection
+from models.guest import Guest
+from models.hotel import Hotel
+
+
+def timed(label, func, count):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s  {count / elapsed:12,.0f} rows/s")
+    return elapsed
+
+
+def validated_hydration():
+    for row in get_connection().execute("SELECT * FROM guests").fetchall():
+        guest = Guest(row[1], row[2])
+        guest.id = row[0]
+
+
+def trusted_hydration():
+    Guest.all.clear()
+    Guest.get_all()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    Hotel.create_table()
+    Guest.create_table()
+    hotels = Hotel.create_many((f"Hotel {i}", f"{i} Main Street") for i in range(100))
+    Guest.create_many((f"Guest {i}", hotels[i % len(hotels)].id) for i in range(count))
+
+    slow = timed("validated constructor", validated_hydration, count)
+    fast = timed("instance_from_db", trusted_hydration, count)
+    print(f"speedup: {slow / fast:.1f}x")
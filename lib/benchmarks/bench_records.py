@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# lib/benchmarks/bench_records.py
+
+"""Compare listing the guests with their hotels as Guest objects against the
+read-only GuestRecord tuples returned with records=True, in time and in memory
+allocated per row.
+
+Usage: python benchmarks/bench_records.py [guest_count]"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the benchmark rows out of lib/hotel.db
+os.environ["HOTEL_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from models.guest import Guest
+from models.hotel import Hotel
+from models.identity_map import IdentityMap
+
+
+def measured(label, func, count):
+    # Start from empty identity maps so every run hydrates every row
+    Hotel.all = IdentityMap(None)
+    Guest.all = IdentityMap(None)
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    Hotel.all = IdentityMap(None)
+    Guest.all = IdentityMap(None)
+    tracemalloc.start()
+    result = func()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    print(f"{label:<16} {elapsed:8.3f}s  {count / elapsed:12,.0f} rows/s  {size / count:8.0f} bytes/row")
+    return elapsed, size
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    Hotel.create_table()
+    Guest.create_table()
+    hotels = Hotel.create_many((f"Hotel {i}", f"{i} Main Street") for i in range(100))
+    Guest.create_many((f"Guest {i}", hotels[i % len(hotels)].id) for i in range(count))
+    del hotels
+
+    objects = measured("Guest objects", lambda: Guest.get_all(with_hotel=True), count)
+    records = measured("GuestRecord", lambda: Guest.get_all(with_hotel=True, records=True), count)
+    print(f"speedup: {objects[0] / records[0]:.1f}x, memory: {records[1] / objects[1]:.0%} of the objects")
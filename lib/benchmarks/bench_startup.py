@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# lib/benchmarks/bench_startup.py
+
+"""Time the startup of cli.py in fresh interpreters: importing it, and running a
+trivial one-shot command against a small database. Exits with status 1 when the
+median command time goes over the budget, so the number can be tracked in CI.
+
+Usage: python benchmarks/bench_startup.py [runs]
+The budget defaults to 250 ms, override it with HOTEL_STARTUP_BUDGET_MS."""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+LIB = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET_MS = float(os.environ.get("HOTEL_STARTUP_BUDGET_MS", 250))
+
+COMMANDS = {
+    "import cli": [sys.executable, "-c", "import cli"],
+    "cli.py --help": [sys.executable, "cli.py", "--help"],
+    "cli.py occupancy-report": [sys.executable, "cli.py", "occupancy-report", "--top", "1"],
+}
+
+
+def timed_runs(command, env, runs):
+    """Return the wall clock time of each run of command, in milliseconds"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=LIB, env=env, stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    # Keep the benchmark rows out of lib/hotel.db
+    env = dict(os.environ, HOTEL_DB_PATH=os.path.join(tempfile.mkdtemp(), "bench.db"))
+    subprocess.run([sys.executable, "-c", (
+        "from models.hotel import Hotel; from models.guest import Guest; "
+        "Hotel.create_table(); Guest.create_table(); Hotel.create('Sonder', '545 Utica Avenue')"
+    )], cwd=LIB, env=env, check=True)
+
+    baseline = statistics.median(timed_runs([sys.executable, "-c", "pass"], env, runs))
+    print(f"{'python -c pass':<26} {baseline:8.1f} ms")
+    for label, command in COMMANDS.items():
+        median = statistics.median(timed_runs(command, env, runs))
+        print(f"{label:<26} {median:8.1f} ms  (+{median - baseline:.1f} ms over the interpreter)")
+
+    print(f"budget: {median:.1f} ms of {BUDGET_MS:.0f} ms")
+    sys.exit(0 if median <= BUDGET_MS else 1)
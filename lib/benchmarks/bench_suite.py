@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# lib/benchmarks/bench_suite.py
+
+"""Time the ORM and CLI hot paths over Faker generated datasets of several sizes
+and write the results as JSON, so runs can be compared over time.
+
+Every dataset has GUESTS_PER_HOTEL guests per hotel and is generated from a fixed
+seed, so two runs of the same size time the same rows. Identity maps and the query
+cache are emptied before every timed run, each timing is the median of --repeat runs.
+
+Usage: python benchmarks/bench_suite.py [--sizes 1k,100k,1m] [--repeat 3]
+                                        [--output results.json] [--compare previous.json]"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Keep the benchmark rows out of lib/hotel.db
+os.environ["HOTEL_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "bench.db")
+
+from faker import Faker
+import helpers
+from models.cache import get_cache
+from models.guest import Guest
+from models.hotel import Hotel
+
+SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+GUESTS_PER_HOTEL = 50
+# Faker is slow, the guest names are drawn from a pool of generated names
+NAME_POOL_SIZE = 20_000
+INSERT_CHUNK_SIZE = 50_000
+# Number of lookups timed by the per call operations
+SAMPLE_SIZE = 1_000
+SEED = 2024
+
+
+def empty_identity_maps():
+    """Empty the identity maps and the query cache, so every timed run reads and hydrates every row"""
+    Hotel.all.clear()
+    Guest.all.clear()
+    get_cache().clear()
+
+
+def generate(guest_count, faker, rng):
+    """Recreate the tables with guest_count guests spread over their hotels"""
+    Guest.drop_table()
+    Hotel.drop_table()
+    Hotel.create_table()
+    Guest.create_table()
+    empty_identity_maps()
+
+    hotel_count = max(1, guest_count // GUESTS_PER_HOTEL)
+    hotels = Hotel.create_many([(faker.company(), faker.street_address()) for _ in range(hotel_count)])
+    hotel_ids = [hotel.id for hotel in hotels]
+    names = [faker.name() for _ in range(min(NAME_POOL_SIZE, guest_count))]
+    for start in range(0, guest_count, INSERT_CHUNK_SIZE):
+        count = min(INSERT_CHUNK_SIZE, guest_count - start)
+        Guest.create_many([(rng.choice(names), rng.choice(hotel_ids)) for _ in range(count)])
+        empty_identity_maps()
+    return hotel_ids, names
+
+
+def timed(func, repeat):
+    """Return the median wall clock seconds of repeat runs of func, each from empty identity maps"""
+    times = []
+    for _ in range(repeat):
+        empty_identity_maps()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def operations(guest_count, hotel_ids, names, faker, rng):
+    """Return operation name -> (function, number of calls or rows it times)"""
+    guest_ids = rng.sample(range(1, guest_count + 1), min(SAMPLE_SIZE, guest_count))
+    sample_names = [rng.choice(names) for _ in range(SAMPLE_SIZE)]
+    sample_hotels = rng.sample(hotel_ids, min(SAMPLE_SIZE // 10, len(hotel_ids)))
+    records = Guest.get_all(records=True)
+    pattern = rng.choice(names)[:4]
+    new_hotels = [(faker.company(), faker.street_address()) for _ in range(SAMPLE_SIZE)]
+    # The name length finders time the rows they return, not the rows of the table
+    name_length_matches = max(1, len(Guest.find_by_name_length(12, records=True)))
+
+    def guests_of_hotels():
+        for id in sample_hotels:
+            Hotel.find_by_id(id).guests()
+
+    return {
+        "Guest.get_all": (Guest.get_all, guest_count),
+        "Guest.get_all(records)": (lambda: Guest.get_all(records=True), guest_count),
+        "Guest.find_by_id": (lambda: [Guest.find_by_id(id) for id in guest_ids], len(guest_ids)),
+        "Guest.find_by_name": (lambda: [Guest.find_by_name(name) for name in sample_names], SAMPLE_SIZE),
+        "Guest.find_by_name_length": (lambda: Guest.find_by_name_length(12), name_length_matches),
+        "Guest.find_by_name_length(records)": (lambda: Guest.find_by_name_length(12, records=True), name_length_matches),
+        "Hotel.guests": (guests_of_hotels, len(sample_hotels)),
+        "helpers.fuzzy_match": (lambda: helpers.fuzzy_match(pattern, records), guest_count),
+        "helpers.all_hotels_in_db": (helpers.all_hotels_in_db, len(hotel_ids)),
+        "helpers.all_guests_in_db": (helpers.all_guests_in_db, guest_count),
+        # Last, the hotels it creates are not part of the dataset
+        "Hotel.create": (lambda: [Hotel.create(*hotel) for hotel in new_hotels], SAMPLE_SIZE),
+    }
+
+
+def run(label, guest_count, repeat):
+    faker = Faker()
+    Faker.seed(SEED)
+    rng = random.Random(SEED)
+
+    start = time.perf_counter()
+    hotel_ids, names = generate(guest_count, faker, rng)
+    result = {
+        "guests": guest_count,
+        "hotels": len(hotel_ids),
+        "generate_seconds": round(time.perf_counter() - start, 3),
+        "operations": {},
+    }
+    print(f"\n{label}: {guest_count:,} guests in {len(hotel_ids):,} hotels, generated in {result['generate_seconds']:.1f}s")
+
+    for name, (func, count) in operations(guest_count, hotel_ids, names, faker, rng).items():
+        # Hotel.create adds rows, run it once
+        seconds = timed(func, 1 if name == "Hotel.create" else repeat)
+        result["operations"][name] = {
+            "seconds": round(seconds, 6),
+            "count": count,
+            "us_per_item": round(seconds / count * 1e6, 3),
+        }
+        print(f"  {name:<36} {seconds:9.4f}s  {seconds / count * 1e6:10.2f} us/item  ({count:,} items)")
+    return result
+
+
+def compare(results, previous):
+    """Print the ratio of every timing to the same timing in previous, a results dictionary"""
+    print(f"\nCompared with the run of {previous['meta']['timestamp']} (>1 is slower):")
+    for label, dataset in results["datasets"].items():
+        old = previous["datasets"].get(label, {}).get("operations", {})
+        for name, timing in dataset["operations"].items():
+            if name in old and old[name]["seconds"]:
+                print(f"  {label:>4} {name:<36} {timing['seconds'] / old[name]['seconds']:6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ORM and CLI hot paths.")
+    parser.add_argument("--sizes", default="1k,100k", help="comma separated dataset sizes among " + ", ".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="runs per timing, the median is kept")
+    parser.add_argument("--output", default=None, help="JSON results file, bench-<timestamp>.json by default")
+    parser.add_argument("--compare", default=None, help="previous JSON results file to compare against")
+    args = parser.parse_args()
+
+    timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    results = {
+        "meta": {
+            "timestamp": timestamp,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": SEED,
+        },
+        "datasets": {},
+    }
+    for label in args.sizes.split(","):
+        results["datasets"][label] = run(label, SIZES[label], args.repeat)
+
+    output = args.output or f"bench-{timestamp.replace(':', '')}.json"
+    with open(output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(results, json.load(file))
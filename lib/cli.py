@@ -1,18 +1,38 @@
 #!/usr/bin/env python3
 
-from re import L
 import click
+import sys
 from models.guest import *
 from models.hotel import *
+from models.connection import configure, get_connection
+from models.search import create_search_index
+from models.transaction import commit
 import os
 from helpers import *
 
-clear_history_cli()
-
 @click.group()
-def cli():
+@click.option('--db', default=None, envvar='HOTEL_DB_PATH', help='Path of the SQLite database file.')
+@click.option('--trace-sql', is_flag=True, default=False, envvar='HOTEL_TRACE_SQL',
+              help='Report the SQL statements of every command on standard error.')
+@click.pass_context
+def cli(ctx, db=None, trace_sql=False):
     '''When arguments for this function are empty, as a click.group it will invoke the 'menu' command within this group.'''
-    pass
+    if db:
+        configure(db)
+    if trace_sql:
+        from models.trace import start_tracing
+        ctx.meta["sql_trace"] = start_tracing()
+        ctx.call_on_close(lambda: report_sql_trace(ctx, ctx.invoked_subcommand))
+    # Clear the terminal when the interactive menu starts, one-shot commands keep the terminal as is
+    if ctx.invoked_subcommand == "menu":
+        clear_history_cli()
+
+def report_sql_trace(ctx, label):
+    '''With --trace-sql, echo the statements run since the last report to standard error.'''
+    trace = ctx.meta.get("sql_trace")
+    if trace is not None and (trace.statements or trace.calls):
+        click.echo(trace.format_report(label), err=True)
+        trace.reset()
 
 def clear_screen(message_to_terminal=None, clear_history=True):
     
@@ -24,8 +44,12 @@ def clear_screen(message_to_terminal=None, clear_history=True):
             result = func(*args, **kwargs)
             clear_history_cli() if clear_history else None
             styled_dashes_text(message_to_terminal) if message_to_terminal else None
-            click.echo(result) if result else None
-            ctx.invoke(menu)
+            echo_result(result)
+            report_sql_trace(ctx, ctx.command.name)
+            # A command run on its own continues with the menu when someone is at the terminal,
+            # inside the menu loop the action just returns to the loop
+            if not ctx.meta.get("menu_running") and sys.stdin.isatty():
+                ctx.invoke(menu)
         
         return inner_wrapper
         
@@ -35,36 +59,30 @@ def clear_screen(message_to_terminal=None, clear_history=True):
 @click.pass_context
 def menu(ctx):
     """Display a menu of options."""
+    actions = {
+        '1': create_hotel,
+        '2': update_hotel,
+        '3': delete_hotel,
+        '4': display_all_hotels,
+        '5': search_hotel_by_name,
+        '6': search_hotel_by_id,
+        '7': create_guest,
+        '8': update_guest,
+        '9': delete_guest,
+        '10': search_for_guest_by_id,
+        '11': search_for_guest_by_name,
+        '12': display_all_guests,
+        '13': search_for_guests_from_one_hotel,
+        '14': search_for_guests_by_name_length,
+    }
 
-    choice = display_menu()
-    if choice == '1':
-        ctx.invoke(create_hotel)
-    elif choice == '2':
-        ctx.invoke(update_hotel)
-    elif choice == '3':
-        ctx.invoke(delete_hotel)
-    elif choice == '4':
-        ctx.invoke(display_all_hotels)
-    elif choice == '5':
-        ctx.invoke(search_hotel_by_name)
-    elif choice == '6':
-        ctx.invoke(search_hotel_by_id)    
-    elif choice == '7':
-        ctx.invoke(create_guest)
-    elif choice == '8':
-        ctx.invoke(update_guest)
-    elif choice == '9':
-        ctx.invoke(delete_guest)
-    elif choice == '10':
-        ctx.invoke(search_for_guest_by_id)
-    elif choice == '11':
-        ctx.invoke(search_for_guest_by_name)
-    elif choice == '12':
-        ctx.invoke(display_all_guests)
-    elif choice == '13':
-        ctx.invoke(search_for_guests_from_one_hotel)
-    elif choice == '14':
-        exit_program()
+    ctx.meta["menu_running"] = True
+    while True:
+        choice = display_menu()
+        if choice == '15':
+            exit_program()
+        elif choice in actions:
+            ctx.invoke(actions[choice])
 
 
 @cli.command()
@@ -89,9 +107,9 @@ def update_hotel(id: int = None, name:str = None, location: str = None):
     @clear_screen("Hotel Updated")
     def wrapper():
         styled_dashes_text("Updating a hotel")
-        print(all_hotels_in_db()) if id == None else None
+        page_hotels() if id == None else None
         hotel_selected = Hotel.find_by_id(click.prompt("\nEnter the hotel id from the list of available hotels above", type=int)) if id == None else Hotel.find_by_id(int(id))
-        while hotel_selected not in Hotel.get_all():
+        while hotel_selected is None:
             click.echo("That hotel is not in our db. Please re-enter the id for an existing hotel")
             hotel_selected = Hotel.find_by_id(click.prompt("\nEnter the hotel id from the list of available hotels above", type=int)) if id == None else Hotel.find_by_id(int(id))
         click.echo(f"Hotel Selected: {hotel_selected}") if name == None else None
@@ -103,25 +121,37 @@ def update_hotel(id: int = None, name:str = None, location: str = None):
 
 @cli.command()
 @click.option('--id', default=None, help='ID of hotel to delete.')
-def delete_hotel(id:int = None):
-    """Delete a hotel by ID."""
+@click.option('--cascade', is_flag=True, default=False, help='Delete the guests of the hotel without asking.')
+@click.option('--restrict', is_flag=True, default=False, help='Refuse to delete a hotel that still has guests.')
+def delete_hotel(id:int = None, cascade:bool = False, restrict:bool = False):
+    """Delete a hotel by ID, along with its guests once confirmed."""
     
     @clear_screen("Hotel Deleted")
     def wrapper():
         styled_dashes_text("Deleting a hotel")
-        print(all_hotels_in_db()) if id == None else None
+        page_hotels() if id == None else None
         hotel_selected = Hotel.find_by_id(click.prompt("\nEnter the hotel id from the list of available hotels above", type=int)) if id == None else Hotel.find_by_id(int(id))
-        return hotel_selected.delete()
+        guest_count = hotel_selected.count_guests()
+        if restrict:
+            try:
+                return hotel_selected.delete("restrict")
+            except ValueError:
+                return f"{hotel_selected} still has {guest_count} guests, nothing was deleted"
+        # Without a terminal to ask, as in scripted runs, the guests are kept
+        delete_guests = cascade or (guest_count and sys.stdin.isatty() and click.confirm(f"\n{hotel_selected} has {guest_count} guests. Delete them too? Otherwise they keep its hotel ID"))
+        return hotel_selected.delete("cascade" if delete_guests else "keep")
     return wrapper()
 
 
 @cli.command()
-def display_all_hotels():
+@click.option('--limit', default=PAGE_SIZE, help='Number of hotels per page.')
+@click.option('--after', default=None, type=int, help='List the hotels after this hotel ID.')
+def display_all_hotels(limit=PAGE_SIZE, after=None):
     """Display all hotels."""
-    @clear_screen("Displaying All Hotels")
+    @clear_screen("Displaying All Hotels", False)
     def wrapper():
         styled_dashes_text("Displaying all hotels")
-        return all_hotels_in_db()  
+        page_hotels(limit, after)
     return wrapper()    
         
 @cli.command()
@@ -133,7 +163,7 @@ def search_hotel_by_name(name=None):
     def wrapper():
         hotel_name_to_search = click.prompt("\nEnter the name of the hotel to search") if name == None else name
         hotel_matches = ""
-        for index, entry in enumerate(fuzzy_match(hotel_name_to_search, Hotel.get_all())):
+        for index, entry in enumerate(Hotel.search(hotel_name_to_search, SEARCH_RESULT_LIMIT, columns=("name",), records=True)):
             hotel_matches += f"{index+1}. {entry}\n"
         return hotel_matches
     return wrapper()
@@ -145,7 +175,7 @@ def search_hotel_by_id(id):
     
     @clear_screen("Found Entry For Hotel Searched By ID")
     def wrapper():
-        print(all_hotels_in_db())
+        page_hotels()
         return Hotel.find_by_id(click.prompt("\nEnter the ID of the hotel to search", type=int)) if id == None else Hotel.find_by_id(int(id))
 
     return wrapper()
@@ -159,7 +189,7 @@ def create_guest(id=None, name=None):
     @clear_screen("Created A New Guest")
     def wrapper():
         styled_dashes_text("Creating a guest")
-        print(all_hotels_in_db(), end="\n\n") if id == None else None
+        page_hotels() if id == None else None
         guest_hotel_id = click.prompt("Enter the ID of the hotel the guest is staying at", type=int) if id == None else int(id)
         guest_name = click.prompt("\nEnter the name of the guest", type=str) if name == None else name
         return Guest.create(guest_name, guest_hotel_id)
@@ -176,16 +206,16 @@ def update_guest(gid:int=None, hid:int=None, name:str=None):
     @clear_screen("Updated A Guest")
     def wrapper():
         styled_dashes_text("Updating A Guest")
-        print(all_guests_in_db(), end="\n\n") if gid == None else None
+        page_guests() if gid == None else None
         guest = Guest.find_by_id(click.prompt("Enter the ID of the guest you want to update", type=int)) if hid == None else Guest.find_by_id(int(hid))
-        while guest not in Guest.get_all():
+        while guest is None:
             click.echo("\nThat guest ID is not in our db. Please enter an existing guest ID from the list of guests above.")
             guest = Guest.find_by_id(click.prompt("Enter the ID of the guest you want to update", type=int)) 
         guest_name = click.prompt("\nEnter the updated name of the guest", type=str) if name == None else name
-        print(all_hotels_in_db(), end="\n\n") if hid == None else None
+        page_hotels() if hid == None else None
         guest_hotel_id = click.prompt("\nEnter the updated ID of the hotel our guest is staying at", type=int) if hid == None else int(hid)
         found_hotel = Hotel.find_by_id(guest_hotel_id)
-        while found_hotel not in Hotel.get_all():
+        while found_hotel is None:
             click.echo("\nThat hotel is not in our db. Please enter a hotel ID from the list of hotels above.")
             guest_hotel_id = click.prompt("Enter the ID of the hotel you are looking for", type=int) 
             found_hotel = Hotel.find_by_id(guest_hotel_id)
@@ -202,10 +232,10 @@ def delete_guest(id=None):
     @clear_screen("Deleted A Guest")
     def wrapper():
         styled_dashes_text("Deleting A Guest")
-        print(all_guests_in_db(), end="\n\n") if id == None else None
+        page_guests() if id == None else None
         guest_search = click.prompt("Enter the ID of the guest you want to delete", type=int) if id == None else Guest.find_by_id(int(id))
         found_guest = Guest.find_by_id(guest_search)
-        while found_guest not in Guest.get_all():
+        while found_guest is None:
             click.echo("\nThat guest is not in our db. Please enter a guest ID from the list of guests above.")
             guest_search = click.prompt("Enter the ID of the guest you want to delete", type=int)
             found_guest = Guest.find_by_id(guest_search)
@@ -214,13 +244,15 @@ def delete_guest(id=None):
     return wrapper()
 
 @cli.command()
-def display_all_guests():
-    """Display all hotels."""
+@click.option('--limit', default=PAGE_SIZE, help='Number of guests per page.')
+@click.option('--after', default=None, type=int, help='List the guests after this guest ID.')
+def display_all_guests(limit=PAGE_SIZE, after=None):
+    """Display all guests."""
     
-    @clear_screen("Displaying All Guests")
+    @clear_screen("Displaying All Guests", False)
     def wrapper():
-        styled_dashes_text("Displaying all hotels")
-        return all_guests_in_db()
+        styled_dashes_text("Displaying all guests")
+        page_guests(limit, after)
     
     return wrapper()
 
@@ -232,10 +264,10 @@ def search_for_guest_by_id(id=None):
     @clear_screen("Found Entry For Guest Searched By ID")
     def wrapper():
         styled_dashes_text("Searching A Guest By ID")
-        print(all_guests_in_db(), end="\n\n")
+        page_guests()
         guest_search = click.prompt("Enter the ID of the guest you are searching for", type=int) if id == None else Guest.find_by_id(int(id))
         found_guest = Guest.find_by_id(guest_search)
-        while found_guest not in Guest.get_all():
+        while found_guest is None:
             click.echo("\nThat guest is not in our db. Please enter a guest ID from the list of guests above.")
             guest_search = click.prompt("Enter the name of the guest you are searching for", type=int)
             found_guest = Guest.find_by_id(guest_search)
@@ -251,10 +283,9 @@ def search_for_guest_by_name(name=None):
     @clear_screen("Found Entries For Guest Searched By Name")
     def wrapper():
         styled_dashes_text("Searching A Guest By Name")
-        print(all_guests_in_db())
         guest_name_to_search = input("\nEnter the name of the guest: ") if name == None else name
         guest_matches = ""
-        for index, entry in enumerate(fuzzy_match(guest_name_to_search, Guest.get_all())):
+        for index, entry in enumerate(Guest.search(guest_name_to_search, SEARCH_RESULT_LIMIT, with_hotel=True, records=True)):
             guest_matches += f"{index+1}. {entry}\n"
         return guest_matches if len(guest_matches) > 0 else "No guests found by that name"
     
@@ -268,7 +299,7 @@ def search_for_guests_from_one_hotel(id:int=None):
     @clear_screen("Found Entries For Guests Within One Hotel")
     def wrapper():
         styled_dashes_text("Displaying All Guests Within One Hotel")
-        print(all_hotels_in_db())
+        page_hotels()
         hotel = Hotel.find_by_id(click.prompt("\nSelect the hotel by ID to check their guest list", type=int)) if id == None else int(id)
         guest_matches = ""
         for index, entry in enumerate(hotel.guests()):
@@ -277,6 +308,121 @@ def search_for_guests_from_one_hotel(id:int=None):
     
     return wrapper() 
 
+@cli.command()
+@click.option('--length', default=None, help='length of guest name')
+@click.option('--min-length', default=None, help='minimum length of guest name')
+@click.option('--count', is_flag=True, help='only print the number of matching guests')
+def search_for_guests_by_name_length(length:int=None, min_length:int=None, count:bool=False):
+    """Displays all guests whose name is equal to or less than length, and at least min_length long"""
+
+    @clear_screen("Found Entries For Guests With Selected Name Length")
+    def wrapper():
+        styled_dashes_text("Displaying All Guests With Specific Name Length")
+        guest_name_length = click.prompt("\nEnter the name length to search guest names by", type=int) if length == None else int(length)
+        guest_min_name_length = 0 if min_length == None else int(min_length)
+        if count:
+            return f"{Guest.count_by_name_length_between(guest_min_name_length, guest_name_length)} guests found for this length"
+        guest_matches = ""
+        for index, entry in enumerate(Guest.iter_by_name_length_between(guest_min_name_length, guest_name_length, with_hotel=True, records=True)):
+            guest_matches += f"{index+1}. {entry}\n"
+        return guest_matches if len(guest_matches) > 0 else "No guests found for this length"
+
+    return wrapper()
+
+@cli.command()
+def create_indexes():
+    """Add the indexes and full-text search indexes declared by the models that are missing from the database."""
+    created, missing = [], []
+    for model in (Hotel, Guest):
+        if get_connection().execute(model.sql["table_exists"]).fetchone() is None:
+            missing.append(model.table)
+            continue
+        created += model.create_indexes()
+        if get_connection().execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f"{model.table}_fts",)).fetchone() is None:
+            if create_search_index(model.table, model.search_columns):
+                created.append(f"{model.table}_fts")
+    commit()
+    get_connection().execute("ANALYZE")
+    if created or not missing:
+        click.echo(f"Created indexes: {', '.join(created)}" if created else "All indexes already exist")
+    if missing:
+        click.echo(f"Skipped the missing tables: {', '.join(missing)}")
+
+@cli.command()
+@click.option('--top', default=10, help='Number of most occupied hotels to list.')
+@click.option('--all', 'show_all', is_flag=True, default=False, help='Also list the guest count of every hotel.')
+def occupancy_report(top=10, show_all=False):
+    """Report guest counts per hotel, computed by the database."""
+    totals = Hotel.occupancy()
+    styled_dashes_text("Occupancy Report")
+    click.echo(f"\n{totals['hotels']} hotels, {totals['guests']} guests, "
+               f"{totals['hotels_without_guests']} hotels without guests")
+
+    click.echo(f"\nTop {top} hotels by guest count:")
+    echo_lines(f"{index}. {hotel} -- {count} guests"
+               for index, (hotel, count) in enumerate(Hotel.most_occupied(top, records=True), start=1))
+
+    click.echo("\nHotels without guests:")
+    echo_lines(str(hotel) for hotel in Hotel.without_guests(records=True))
+
+    if show_all:
+        click.echo("\nGuests per hotel:")
+        echo_lines(f"{hotel} -- {count} guests" for hotel, count in Hotel.guest_counts(records=True))
+
+@cli.command()
+@click.option('--script', type=click.File('r'), default='-', help='JSON lines file of operations, - reads standard input.')
+def run(script):
+    """Run a stream of operations in one transaction, without prompts."""
+    from batch import run_batch, BatchError
+    try:
+        summary = run_batch(script, echo=click.echo)
+    except BatchError as error:
+        raise click.ClickException(f"{error}. Nothing was saved.")
+    counts = ", ".join(f"{count} {name}" for name, count in summary["counts"].items())
+    rate = summary["operations"] / summary["seconds"] if summary["seconds"] else 0
+    click.echo(f"Ran {summary['operations']} operations ({counts or 'none'}) "
+               f"in {summary['seconds']:.3f}s, {rate:,.0f} operations/s")
+
+@cli.command(name="import")
+@click.argument('table', type=click.Choice(['hotels', 'guests']))
+@click.argument('source')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None, help='File format, taken from the file extension by default.')
+@click.option('--chunk-size', default=10000, help='Number of rows inserted per transaction.')
+@click.option('--errors', default=None, help='File receiving the rejected rows as JSON lines.')
+def import_rows(table, source, fmt=None, chunk_size=10000, errors=None):
+    """Import hotels or guests from a CSV or JSON lines file, - reads standard input."""
+    from contextlib import nullcontext
+    from transfer import MODELS, detect_format, open_text, import_rows
+
+    def progress(summary):
+        rate = summary["imported"] / summary["seconds"] if summary["seconds"] else 0
+        click.echo(f"\r{summary['imported']} imported, {summary['rejected']} rejected, {rate:,.0f} rows/s", nl=False, err=True)
+
+    with open_text(source) as rows, (open_text(errors, "w") if errors else nullcontext()) as error_file:
+        summary = import_rows(MODELS[table], rows, fmt or detect_format(source), chunk_size, error_file, progress)
+    rate = summary["imported"] / summary["seconds"] if summary["seconds"] else 0
+    click.echo(f"\nImported {summary['imported']} {table} in {summary['seconds']:.2f}s ({rate:,.0f} rows/s), "
+               f"rejected {summary['rejected']}" + (f", see {errors}" if errors and summary["rejected"] else ""), err=True)
+
+@cli.command()
+@click.argument('table', type=click.Choice(['hotels', 'guests']))
+@click.argument('destination', default='-')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None, help='File format, taken from the file extension by default.')
+@click.option('--with-hotel', is_flag=True, default=False, help='Add the name and location of the hotel to every guest.')
+@click.option('--gzip', 'compress', is_flag=True, default=False, help='Compress the output, implied by a .gz destination.')
+def export(table, destination='-', fmt=None, with_hotel=False, compress=False):
+    """Export hotels or guests to a CSV or JSON lines file, - writes standard output."""
+    import time
+    from transfer import MODELS, detect_format, open_text, export_rows
+    if with_hotel and table != 'guests':
+        raise click.UsageError("--with-hotel only applies to guests")
+
+    start = time.perf_counter()
+    with open_text(destination, "w", compress or destination.endswith(".gz")) as out:
+        count = export_rows(MODELS[table], out, fmt or detect_format(destination), with_hotel=with_hotel)
+    elapsed = time.perf_counter() - start
+    click.echo(f"Exported {count} {table} in {elapsed:.2f}s ({count / elapsed if elapsed else 0:,.0f} rows/s)", err=True)
+
 if __name__ == "__main__":
     cli()
 
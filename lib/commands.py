@@ -1,17 +1,18 @@
 #!/usr/bin/env python3
 import click
+import sys
 from models.guest import *
 from models.hotel import *
 from helpers import *
 
-
-clear_history_cli()
-
 # @click.group()
 # def cli():
 #     '''When arguments for this function are empty, as a click.group it will invoke the 'menu' command within this group.'''
 #     pass
 
+# Set while menu() runs its loop, so the actions it runs return to the loop instead of starting another menu
+_menu_running = False
+
 def clear_screen(message_to_terminal=None, clear_history=True):
     
     '''Decorator to handle the post function notification to user via CLI.'''
@@ -21,8 +22,10 @@ def clear_screen(message_to_terminal=None, clear_history=True):
             result = func(*args, **kwargs)
             clear_history_cli() if clear_history else None
             styled_dashes_text(message_to_terminal) if message_to_terminal else None
-            click.echo(result) if result else None
-            menu()
+            echo_result(result)
+            # A command run on its own continues with the menu when someone is at the terminal
+            if not _menu_running and sys.stdin.isatty():
+                menu()
         
         return inner_wrapper
         
@@ -30,39 +33,34 @@ def clear_screen(message_to_terminal=None, clear_history=True):
 
 
 def menu():
-    """Display a menu of options."""
-
-    choice = display_menu()
-    if choice == '1':
-        create_hotel()
-    elif choice == '2':
-        update_hotel()
-    elif choice == '3':
-        delete_hotel()
-    elif choice == '4':
-        display_all_hotels()
-    elif choice == '5':
-        search_hotel_by_name()
-    elif choice == '6':
-        search_hotel_by_id()
-    elif choice == '7':
-        create_guest()
-    elif choice == '8':
-        update_guest()
-    elif choice == '9':
-        delete_guest()
-    elif choice == '10':
-        search_for_guest_by_id()
-    elif choice == '11':
-        search_for_guest_by_name()
-    elif choice == '12':
-        display_all_guests()
-    elif choice == '13':
-        search_for_guests_from_one_hotel()
-    elif choice == '14':
-        search_for_guests_by_name_length()
-    elif choice == '15':
-        exit_program()
+    """Display a menu of options and run the chosen actions in a loop until the user exits."""
+    global _menu_running
+    actions = {
+        '1': create_hotel,
+        '2': update_hotel,
+        '3': delete_hotel,
+        '4': display_all_hotels,
+        '5': search_hotel_by_name,
+        '6': search_hotel_by_id,
+        '7': create_guest,
+        '8': update_guest,
+        '9': delete_guest,
+        '10': search_for_guest_by_id,
+        '11': search_for_guest_by_name,
+        '12': display_all_guests,
+        '13': search_for_guests_from_one_hotel,
+        '14': search_for_guests_by_name_length,
+        '15': exit_program,
+    }
+
+    _menu_running = True
+    try:
+        while True:
+            action = actions.get(display_menu())
+            if action:
+                action()
+    finally:
+        _menu_running = False
 
 @clear_screen("New Hotel Created")
 def create_hotel(name=None, location=None):
@@ -77,9 +75,9 @@ def create_hotel(name=None, location=None):
 def update_hotel(id: int = None, name:str = None, location: str = None):
     """Update an existing hotel."""
     styled_dashes_text("Updating a hotel")
-    print(all_hotels_in_db()) if id == None else None
+    page_hotels() if id == None else None
     hotel_selected = Hotel.find_by_id(click.prompt("\nEnter the hotel id from the list of available hotels above", type=int)) if id == None else Hotel.find_by_id(int(id))
-    while hotel_selected not in Hotel.get_all():
+    while hotel_selected is None:
         click.echo("That hotel is not in our db. Please re-enter the id for an existing hotel")
         hotel_selected = Hotel.find_by_id(click.prompt("\nEnter the hotel id from the list of available hotels above", type=int)) if id == None else Hotel.find_by_id(int(id))
     click.echo(f"Hotel Selected: {hotel_selected}") if name == None else None
@@ -88,40 +86,47 @@ def update_hotel(id: int = None, name:str = None, location: str = None):
     return hotel_selected.update(new_hotel_name, new_hotel_location)
 
 @clear_screen("Hotel Deleted")
-def delete_hotel(id:int = None):
-    """Delete a hotel by ID."""
+def delete_hotel(id:int = None, cascade:bool = False, restrict:bool = False):
+    """Delete a hotel by ID, along with its guests once confirmed."""
     styled_dashes_text("Deleting a hotel")
-    print(all_hotels_in_db()) if id == None else None
+    page_hotels() if id == None else None
     hotel_selected = Hotel.find_by_id(click.prompt("\nEnter the hotel id from the list of available hotels above", type=int)) if id == None else Hotel.find_by_id(int(id))
-    return hotel_selected.delete()
-
-@clear_screen("Displaying All Hotels")
-def display_all_hotels():
-    """Display all hotels."""
+    guest_count = hotel_selected.count_guests()
+    if restrict:
+        try:
+            return hotel_selected.delete("restrict")
+        except ValueError:
+            return f"{hotel_selected} still has {guest_count} guests, nothing was deleted"
+    # Without a terminal to ask, as in scripted runs, the guests are kept
+    delete_guests = cascade or (guest_count and sys.stdin.isatty() and click.confirm(f"\n{hotel_selected} has {guest_count} guests. Delete them too? Otherwise they keep its hotel ID"))
+    return hotel_selected.delete("cascade" if delete_guests else "keep")
+
+@clear_screen("Displaying All Hotels", False)
+def display_all_hotels(limit:int=None, after:int=None):
+    """Display all hotels, one page at a time."""
     styled_dashes_text("Displaying all hotels")
-    return all_hotels_in_db()  
+    page_hotels(PAGE_SIZE if limit == None else int(limit), None if after == None else int(after))
 
 @clear_screen("Found Entries For Hotel Searched By Name", True)        
 def search_hotel_by_name(name=None):
     """Search for a hotel by name via fuzzy search"""
-    print(all_hotels_in_db())
     hotel_name_to_search = click.prompt("\nEnter the name of the hotel to search") if name == None else name
     hotel_matches = ""
-    for index, entry in enumerate(fuzzy_match(hotel_name_to_search, Hotel.get_all())):
+    for index, entry in enumerate(Hotel.search(hotel_name_to_search, SEARCH_RESULT_LIMIT, columns=("name",), records=True)):
         hotel_matches += f"{index+1}. {entry}\n"
     return hotel_matches
     
 @clear_screen("Found Entry For Hotel Searched By ID")
 def search_hotel_by_id(id):
     """Search for a hotel by ID"""
-    print(all_hotels_in_db())
+    page_hotels()
     return Hotel.find_by_id(click.prompt("\nEnter the ID of the hotel to search", type=int)) if id == None else Hotel.find_by_id(int(id))
 
 @clear_screen("Created A New Guest")
 def create_guest(id=None, name=None):
     """Create a new guest."""    
     styled_dashes_text("Creating a guest")
-    print(all_hotels_in_db(), end="\n\n") if id == None else None
+    page_hotels() if id == None else None
     guest_hotel_id = click.prompt("Enter the ID of the hotel the guest is staying at", type=int) if id == None else int(id)
     if not Guest.find_by_id(guest_hotel_id):
         print("That hotel ID is not available. Please try again")
@@ -133,16 +138,16 @@ def create_guest(id=None, name=None):
 def update_guest(gid:int=None, hid:int=None, name:str=None):
     """Update an existing guest."""
     styled_dashes_text("Updating A Guest")
-    print(all_guests_in_db(), end="\n\n") if gid == None else None
+    page_guests() if gid == None else None
     guest = Guest.find_by_id(click.prompt("Enter the ID of the guest you want to update", type=int)) if hid == None else Guest.find_by_id(int(hid))
-    while guest not in Guest.get_all():
+    while guest is None:
         click.echo("\nThat guest ID is not in our db. Please enter an existing guest ID from the list of guests above.")
         guest = Guest.find_by_id(click.prompt("Enter the ID of the guest you want to update", type=int)) 
     guest_name = click.prompt("\nEnter the updated name of the guest", type=str) if name == None else name
-    print(all_hotels_in_db(), end="\n\n") if hid == None else None
+    page_hotels() if hid == None else None
     guest_hotel_id = click.prompt("\nEnter the updated ID of the hotel our guest is staying at", type=int) if hid == None else int(hid)
     found_hotel = Hotel.find_by_id(guest_hotel_id)
-    while found_hotel not in Hotel.get_all():
+    while found_hotel is None:
         click.echo("\nThat hotel is not in our db. Please enter a hotel ID from the list of hotels above.")
         guest_hotel_id = click.prompt("Enter the ID of the hotel you are looking for", type=int) 
         found_hotel = Hotel.find_by_id(guest_hotel_id)
@@ -152,29 +157,29 @@ def update_guest(gid:int=None, hid:int=None, name:str=None):
 def delete_guest(id=None):
     """Delete a guest."""
     styled_dashes_text("Deleting A Guest")
-    print(all_guests_in_db(), end="\n\n") if id == None else None
+    page_guests() if id == None else None
     guest_search = click.prompt("Enter the ID of the guest you want to delete", type=int) if id == None else Guest.find_by_id(int(id))
     found_guest = Guest.find_by_id(guest_search)
-    while found_guest not in Guest.get_all():
+    while found_guest is None:
         click.echo("\nThat guest is not in our db. Please enter a guest ID from the list of guests above.")
         guest_search = click.prompt("Enter the ID of the guest you want to delete", type=int)
         found_guest = Guest.find_by_id(guest_search)
     return found_guest if found_guest != None else f"No results found for {guest_search}"
 
-@clear_screen("Displaying All Guests")
-def display_all_guests():
-    """Display all guests."""
-    styled_dashes_text("Displaying all hotels")
-    return all_guests_in_db()
+@clear_screen("Displaying All Guests", False)
+def display_all_guests(limit:int=None, after:int=None):
+    """Display all guests, one page at a time."""
+    styled_dashes_text("Displaying all guests")
+    page_guests(PAGE_SIZE if limit == None else int(limit), None if after == None else int(after))
 
 @clear_screen("Found Entry For Guest Searched By ID")
 def search_for_guest_by_id(id=None):
     """Search for a guest."""
     styled_dashes_text("Searching A Guest By ID")
-    print(all_guests_in_db(), end="\n\n")
+    page_guests()
     guest_search = click.prompt("Enter the ID of the guest you are searching for", type=int) if id == None else Guest.find_by_id(int(id))
     found_guest = Guest.find_by_id(guest_search)
-    while found_guest not in Guest.get_all():
+    while found_guest is None:
         click.echo("\nThat guest is not in our db. Please enter a guest ID from the list of guests above.")
         guest_search = click.prompt("Enter the name of the guest you are searching for", type=int)
         found_guest = Guest.find_by_id(guest_search)
@@ -184,10 +189,9 @@ def search_for_guest_by_id(id=None):
 def search_for_guest_by_name(name=None):
     """Search for a guest by name via fuzzy search."""
     styled_dashes_text("Searching A Guest By Name")
-    print(all_guests_in_db())
     guest_name_to_search = input("\nEnter the name of the guest: ") if name == None else name
     guest_matches = ""
-    for index, entry in enumerate(fuzzy_match(guest_name_to_search, Guest.get_all())):
+    for index, entry in enumerate(Guest.search(guest_name_to_search, SEARCH_RESULT_LIMIT, with_hotel=True, records=True)):
         guest_matches += f"{index+1}. {entry}\n"
     return guest_matches if len(guest_matches) > 0 else "No guests found by that name"
 
@@ -195,7 +199,7 @@ def search_for_guest_by_name(name=None):
 def search_for_guests_from_one_hotel(id:int=None):
     """Displays all guests for a single hotel """
     styled_dashes_text("Displaying All Guests Within One Hotel")
-    print(all_hotels_in_db())
+    page_hotels()
     hotel = Hotel.find_by_id(click.prompt("\nSelect the hotel by ID to check their guest list", type=int)) if id == None else int(id)
     guest_matches = ""
     for index, entry in enumerate(hotel.guests()):
@@ -203,12 +207,14 @@ def search_for_guests_from_one_hotel(id:int=None):
     return guest_matches if len(guest_matches) > 0 else "No guests found for this hotel"
 
 @clear_screen("Found Entries For Guests With Selected Name Length")
-def search_for_guests_by_name_length(length:int=None):
-    """Displays all guests whose name is equal to or less than length"""
+def search_for_guests_by_name_length(length:int=None, min_length:int=None, count:bool=False):
+    """Displays all guests whose name is equal to or less than length, and at least min_length long"""
     styled_dashes_text("Displaying All Guests With Specific Name Length")
-    print(all_guests_in_db())
     guest_name_length = click.prompt("\nEnter the name length to search guest names by", type=int) if length == None else int(length)
+    guest_min_name_length = 0 if min_length == None else int(min_length)
+    if count:
+        return f"{Guest.count_by_name_length_between(guest_min_name_length, guest_name_length)} guests found for this length"
     guest_matches = ""
-    for index, entry in enumerate(Guest.find_by_name_length(guest_name_length)):
+    for index, entry in enumerate(Guest.iter_by_name_length_between(guest_min_name_length, guest_name_length, with_hotel=True, records=True)):
         guest_matches += f"{index+1}. {entry}\n"
     return guest_matches if len(guest_matches) > 0 else "No guests found for this length"
\ No newline at end of file
@@ -1,10 +1,12 @@
 # lib/helpers.py
 
 import click
-import regex
 from models.guest import Guest
 from models.hotel import Hotel
 import os 
+import sys
+from functools import partial
+from types import GeneratorType
 
 # Clear the terminal screen
 def clear_history_cli():
@@ -34,18 +36,72 @@ def display_menu():
     return choice
 
 def all_hotels_in_db():
-    all_hotels = ""
-    for hotel in Hotel.get_all():
-        all_hotels = all_hotels + "\n" + str(hotel) 
-    return all_hotels  
+    return "".join("\n" + line for line in iter_hotels_in_db())
 
 def all_guests_in_db():
-    all_hotels = ""
-    for hotel in Guest.get_all():
-        all_hotels = all_hotels + "\n" + str(hotel) 
-    return all_hotels  
+    return "".join("\n" + line for line in iter_guests_in_db())
+
+def iter_hotels_in_db():
+    """Yield one display line per hotel, streaming the rows from the database"""
+    for hotel in Hotel.iter_all(records=True):
+        yield str(hotel)
+
+def iter_guests_in_db():
+    """Yield one display line per guest, streaming the rows from the database"""
+    for guest in Guest.iter_all(with_hotel=True, records=True):
+        yield str(guest)
+
+# Number of rows listed per page by the paged listings
+PAGE_SIZE = 20
+
+def page_through(fetch_page, limit=PAGE_SIZE, after_id=None):
+    """Echo the objects returned by fetch_page one page at a time with next/previous page controls.
+    fetch_page(after_id=..., before_id=..., limit=...) is a keyset page query such as Hotel.page.
+    Only the first page is echoed when input does not come from a terminal"""
+    page = fetch_page(after_id=after_id, limit=limit)
+    if not page:
+        click.echo("No entries to display")
+        return
+    echo_lines(str(entry) for entry in page)
+    while sys.stdin.isatty():
+        choice = click.prompt("\n[n]ext page, [p]revious page or [q]uit listing", default="q", show_default=False)
+        if choice.lower() == "n":
+            new_page = fetch_page(after_id=page[-1].id, limit=limit)
+        elif choice.lower() == "p":
+            new_page = fetch_page(before_id=page[0].id, limit=limit)
+        else:
+            return
+        if new_page:
+            page = new_page
+            echo_lines(str(entry) for entry in page)
+        else:
+            click.echo("No more entries in that direction")
+
+def page_hotels(limit=PAGE_SIZE, after_id=None):
+    """List the hotels one page at a time"""
+    page_through(partial(Hotel.page, records=True), limit, after_id)
+
+def page_guests(limit=PAGE_SIZE, after_id=None):
+    """List the guests and their hotels one page at a time"""
+    page_through(partial(Guest.page, with_hotel=True, records=True), limit, after_id)
+
+def echo_lines(lines):
+    """Echo each line as soon as it is produced instead of building one string first"""
+    for line in lines:
+        click.echo(line)
+
+def echo_result(result):
+    """Echo a command result, streaming it line by line when it is a generator"""
+    if isinstance(result, GeneratorType):
+        echo_lines(result)
+    elif result:
+        click.echo(result)
+
+# Maximum number of matches listed by the search commands
+SEARCH_RESULT_LIMIT = 50
 
 def fuzzy_match(user_input, database):
+    import regex
     results = []
     
     pattern_string = f"{user_input}"  
@@ -1,4 +1,10 @@
-import sqlite3
+from models.connection import get_connection, get_cursor
 
-CONN = sqlite3.connect('hotel.db')
-CURSOR = CONN.cursor()
+
+def __getattr__(name):
+    """Resolve CONN and CURSOR to the connection and shared cursor of the calling thread"""
+    if name == "CONN":
+        return get_connection()
+    if name == "CURSOR":
+        return get_cursor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
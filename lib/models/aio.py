@@ -0,0 +1,143 @@
+""" Asyncio counterparts of the blocking model methods.
+
+Every call runs on a dedicated thread pool, and each of its threads gets its
+own SQLite connection from the connection manager, so the event loop never waits
+on SQLite I/O. Objects still come from the shared identity maps, so a row maps to
+one object no matter which thread loaded it.
+A transaction() block belongs to the thread that opened it. Async calls made
+inside one do not join it. Run the whole unit of work in one database thread instead:
+
+    await run_in_db_thread(import_guests, rows)
+"""
+
+import functools
+import itertools
+import os
+import threading
+
+# asyncio and concurrent.futures are imported on first use, they are the
+# slowest imports of the models and a blocking CLI command never needs them
+
+# Number of database threads, override with HOTEL_DB_WORKERS
+DB_WORKERS = int(os.environ.get("HOTEL_DB_WORKERS", 4))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the database thread pool, starting it on first use"""
+    global _executor
+    from concurrent.futures import ThreadPoolExecutor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="hotel-db")
+        return _executor
+
+
+def shutdown_executor(wait=True):
+    """Stop the database thread pool, a later call starts a new one"""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Run func(*args, **kwargs) on a database thread and return its result"""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+async def aiterate(make_iterator, batch_size=1000):
+    """ Yield the items of the blocking iterator returned by make_iterator().
+    The iterator is created and consumed on a thread of its own, because its cursor
+    belongs to that thread's connection. It does not take one of the DB_WORKERS threads,
+    so consumers awaiting other async calls between items cannot starve the pool. Items
+    are handed to the event loop in lists of batch_size, and at most two lists are
+    buffered ahead of the consumer."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=2)
+    stop = threading.Event()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        try:
+            iterator = make_iterator()
+            while not stop.is_set():
+                batch = list(itertools.islice(iterator, batch_size))
+                put(batch)
+                if not batch:
+                    return
+        except BaseException as error:
+            put(error)
+
+    producer = threading.Thread(target=produce, name="hotel-db-iterate", daemon=True)
+    producer.start()
+    try:
+        while True:
+            batch = await queue.get()
+            if isinstance(batch, BaseException):
+                raise batch
+            if not batch:
+                break
+            for item in batch:
+                yield item
+    finally:
+        # Unblock a producer waiting for room in the queue so its thread is released
+        stop.set()
+        while producer.is_alive():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.001)
+
+
+class AsyncMixin:
+    """Async versions of the model methods shared by Hotel and Guest"""
+
+    @classmethod
+    async def acreate(cls, *args, **kwargs):
+        return await run_in_db_thread(cls.create, *args, **kwargs)
+
+    @classmethod
+    async def acreate_many(cls, rows):
+        return await run_in_db_thread(cls.create_many, list(rows))
+
+    @classmethod
+    async def aget_all(cls, *args, **kwargs):
+        return await run_in_db_thread(cls.get_all, *args, **kwargs)
+
+    @classmethod
+    async def apage(cls, *args, **kwargs):
+        return await run_in_db_thread(cls.page, *args, **kwargs)
+
+    @classmethod
+    async def afind_by_id(cls, id):
+        return await run_in_db_thread(cls.find_by_id, id)
+
+    @classmethod
+    async def afind_by_name(cls, name):
+        return await run_in_db_thread(cls.find_by_name, name)
+
+    @classmethod
+    async def asearch(cls, text, *args, **kwargs):
+        return await run_in_db_thread(cls.search, text, *args, **kwargs)
+
+    @classmethod
+    def aiter_all(cls, batch_size=1000, **kwargs):
+        """Asynchronously iterate over every row of the table, see iter_all()"""
+        return aiterate(lambda: cls.iter_all(batch_size, **kwargs), batch_size)
+
+    async def asave(self):
+        return await run_in_db_thread(self.save)
+
+    async def aupdate(self, *args):
+        return await run_in_db_thread(self.update, *args)
+
+    async def adelete(self, *args):
+        return await run_in_db_thread(self.delete, *args)
@@ -0,0 +1,545 @@
+from collections import namedtuple
+from models.aio import AsyncMixin
+from models.cache import cached_fetchall, cached_fetchone, invalidating
+from models.connection import get_connection
+from models.identity_map import IdentityMap
+from models.metrics import instrumented
+from models.search import create_search_index, deferred_search_index, drop_search_index, uses_search_index, match_expression, like_pattern
+from models.transaction import transaction, commit, forget_on_rollback, restore_on_rollback
+
+
+def storage_attribute(cls, column):
+    """Return the instance attribute holding column, the underscored one when column is a validating property"""
+    return f"_{column}" if isinstance(getattr(cls, column, None), property) else column
+
+
+def build_row_factory(cls):
+    """ Generate the instance_from_db function of cls.
+    The function assigns the columns of a row straight to their storage attributes,
+    one statement per column, instead of looping over the column list or running
+    the property setters: rows read from the database are trusted."""
+    assignments = [f"obj.{storage_attribute(cls, column)} = row[{index}]"
+                   for index, column in enumerate(cls.columns, start=1)]
+    new_object = "\n        ".join(assignments)
+    known_object = "\n    ".join(assignments)
+    source = f"""
+def instance_from_db(cls, row):
+    # Check the dictionary for an existing instance using the row's primary key
+    obj = cls.all.get(row[0])
+    if obj is None:
+        # not in dictionary, create new instance and add to dictionary
+        obj = cls.__new__(cls)
+        obj.id = row[0]
+        {new_object}
+        # another thread may have mapped the same row in the meantime, keep the first object
+        return cls.all.setdefault(row[0], obj)
+    # ensure attributes match row values in case local instance was modified
+    {known_object}
+    return obj
+"""
+    namespace = {}
+    exec(source, namespace)
+    return namespace["instance_from_db"]
+
+
+def build_values_getter(cls):
+    """ Generate the function returning the column values of an object as a tuple, in column order """
+    values = "".join(f"self.{storage_attribute(cls, column)}, " for column in cls.columns)
+    namespace = {}
+    exec(f"def row_values(self):\n    return ({values})", namespace)
+    return namespace["row_values"]
+
+
+def build_join_reader(from_db, related_from_db, attribute, width):
+    """Return a function hydrating a joined row and attaching the related object to attribute"""
+    def joined_from_db(row):
+        obj = from_db(row[:width])
+        if row[width] is not None:
+            setattr(obj, attribute, related_from_db(row[width:]))
+        return obj
+    return joined_from_db
+
+
+def build_join_record_reader(record, related_record, width):
+    """Return a function turning a joined row into a record whose last field is the related record"""
+    def joined_record(row):
+        related = related_record._make(row[width:]) if row[width] is not None else None
+        return record(*row[:width], related)
+    return joined_record
+
+
+class Model(AsyncMixin):
+    """ Declarative base class of the models.
+    A subclass declares its table and columns once:
+
+        class Hotel(Model):
+            table = "hotels"
+            columns = {"name": "TEXT", "location": "TEXT"}
+
+    When the subclass is created the SQL of every CRUD and listing statement is built,
+    together with a generated row factory (instance_from_db), a generated column
+    values getter and the row readers of the records and joined projections.
+    The id INTEGER PRIMARY KEY column is implied and comes first in every row."""
+
+    # Table name and columns (name -> SQL type) without the id primary key
+    table = None
+    columns = {}
+
+    # Table constraints appended to the column definitions
+    constraints = ()
+
+    # Columns indexed for full-text search by search()
+    search_columns = ()
+
+    # Secondary indexes created along with the table: index name -> indexed columns
+    indexes = {}
+
+    # Models that can be loaded by the same query: name -> model joined on the <name>_id column.
+    # Listing methods take a with_<name> option and attach the related object as _<name>
+    joins = {}
+
+    # Read-only row tuple returned with records=True, generated when not declared
+    record = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.table is None:
+            return
+        if "all" not in vars(cls):
+            cls.all = IdentityMap()
+        if cls.record is None:
+            cls.record = namedtuple(f"{cls.__name__}Record", ("id",) + tuple(cls.columns))
+        if "instance_from_db" not in vars(cls):
+            cls.instance_from_db = classmethod(build_row_factory(cls))
+        cls.storage_attributes = tuple(storage_attribute(cls, column) for column in cls.columns)
+        cls.row_values = build_values_getter(cls)
+        cls.compile_sql()
+        cls.compile_readers()
+
+    @classmethod
+    def compile_sql(cls):
+        """ Build the SQL statements of the model, once per class """
+        table = cls.table
+        names = ", ".join(cls.columns)
+        definitions = ",\n            ".join(
+            ["id INTEGER PRIMARY KEY"]
+            + [f"{column} {type}" for column, type in cls.columns.items()]
+            + list(cls.constraints))
+
+        cls.sql = {
+            "table_exists": f"""
+                SELECT name FROM sqlite_master
+                WHERE type = 'table' AND name = '{table}'
+            """,
+            "create_table": f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                {definitions})
+            """,
+            "drop_table": f"""
+                DROP TABLE IF EXISTS {table}
+            """,
+            "existing_indexes": f"""
+                SELECT name FROM sqlite_master
+                WHERE type = 'index' AND tbl_name = '{table}'
+            """,
+            "insert": f"""
+                INSERT INTO {table} ({names})
+                VALUES ({", ".join("?" for _ in cls.columns)})
+            """,
+            "update": f"""
+                UPDATE {table}
+                SET {", ".join(f"{column} = ?" for column in cls.columns)}
+                WHERE id = ?
+            """,
+            "insert_with_id": f"""
+                INSERT INTO {table} (id, {names})
+                VALUES (?, {", ".join("?" for _ in cls.columns)})
+            """,
+            "upsert": f"""
+                INSERT INTO {table} (id, {names})
+                VALUES (?, {", ".join("?" for _ in cls.columns)})
+                ON CONFLICT (id) DO UPDATE
+                SET {", ".join(f"{column} = excluded.{column}" for column in cls.columns)}
+            """,
+            "delete": f"""
+                DELETE FROM {table}
+                WHERE id = ?
+            """,
+            "ids": f"""
+                SELECT id
+                FROM {table}
+            """,
+            "find_by_id": f"""
+                SELECT *
+                FROM {table}
+                WHERE id = ?
+            """,
+            "find_by": {
+                column: f"""
+                    SELECT *
+                    FROM {table}
+                    WHERE {column} is ?
+                """
+                for column in cls.columns
+            },
+        }
+
+        # Listing statements, one set per join: None selects the table alone
+        cls.queries = {}
+        for join in (None, *cls.joins):
+            if join is None:
+                select, joined = f"{table}.*", ""
+            else:
+                related = cls.joins[join].table
+                select = f"{table}.*, {related}.*"
+                joined = f"LEFT JOIN {related} ON {related}.id = {table}.{join}_id"
+            cls.queries[join] = {
+                "select": f"""
+                    SELECT {select}
+                    FROM {table}
+                    {joined}
+                """,
+                "first_page": f"""
+                    SELECT {select}
+                    FROM {table}
+                    {joined}
+                    ORDER BY {table}.id
+                    LIMIT ?
+                """,
+                "next_page": f"""
+                    SELECT {select}
+                    FROM {table}
+                    {joined}
+                    WHERE {table}.id > ?
+                    ORDER BY {table}.id
+                    LIMIT ?
+                """,
+                "previous_page": f"""
+                    SELECT {select}
+                    FROM {table}
+                    {joined}
+                    WHERE {table}.id < ?
+                    ORDER BY {table}.id DESC
+                    LIMIT ?
+                """,
+                "search": f"""
+                    SELECT {select}
+                    FROM {table}_fts
+                    JOIN {table} ON {table}.id = {table}_fts.rowid
+                    {joined}
+                    WHERE {table}_fts MATCH ?
+                    ORDER BY {table}_fts.rank
+                    LIMIT ?
+                """,
+            }
+
+    @classmethod
+    def compile_readers(cls):
+        """ Build the row readers of the model: (join, records) -> function turning a row into the result """
+        width = len(cls.columns) + 1
+        # _make is the fastest constructor but needs exactly one value per field
+        plain_record = cls.record._make if len(cls.record._fields) == width else (lambda row: cls.record(*row))
+
+        cls.readers = {
+            (None, False): cls.instance_from_db,
+            (None, True): plain_record,
+        }
+        for join, related in cls.joins.items():
+            cls.readers[(join, False)] = build_join_reader(
+                cls.instance_from_db, related.instance_from_db, f"_{join}", width)
+            cls.readers[(join, True)] = build_join_record_reader(cls.record, related.record, width)
+
+    @classmethod
+    def join_from_options(cls, options):
+        """Return the name of the model the with_<name> options ask to load along, or None"""
+        join = None
+        for option, value in options.items():
+            name = option[len("with_"):]
+            if not option.startswith("with_") or name not in cls.joins:
+                raise TypeError(f"{cls.__name__} got an unexpected keyword argument '{option}'")
+            if value:
+                join = name
+        return join
+
+    @classmethod
+    def tables_of(cls, join):
+        """Return the tables read by the listing queries of join, the name of a joined model or None"""
+        return (cls.table,) if join is None else (cls.table, cls.joins[join].table)
+
+    @classmethod
+    def reader(cls, records=False, **options):
+        """Return the function that turns a row of the listing queries into a model object
+        or, when records is True, into a read-only record"""
+        return cls.readers[(cls.join_from_options(options), records)]
+
+    @classmethod
+    def create_table(cls):
+        """ Create the table, its declared indexes and its full-text search index """
+        conn = get_connection()
+        with invalidating(cls.table):
+            new_table = conn.execute(cls.sql["table_exists"]).fetchone() is None
+            conn.execute(cls.sql["create_table"])
+            cls.create_indexes()
+            if cls.search_columns:
+                create_search_index(cls.table, cls.search_columns, rebuild=new_table)
+            commit()
+
+    @classmethod
+    def create_indexes(cls):
+        """ Create the indexes declared in indexes that do not exist yet and return their names.
+        Nothing is created while the table does not exist """
+        if get_connection().execute(cls.sql["table_exists"]).fetchone() is None:
+            return []
+        existing = {row[0] for row in get_connection().execute(cls.sql["existing_indexes"])}
+
+        created = []
+        for name, columns in cls.indexes.items():
+            if name not in existing:
+                get_connection().execute(f"CREATE INDEX {name} ON {cls.table} ({columns})")
+                created.append(name)
+        commit()
+        return created
+
+    @classmethod
+    def drop_table(cls):
+        """ Drop the table and its full-text search index """
+        with invalidating(cls.table):
+            if cls.search_columns:
+                drop_search_index(cls.table)
+            get_connection().execute(cls.sql["drop_table"])
+            commit()
+
+    @instrumented("save")
+    def save(self):
+        """ Insert a new row with the column values of the current object.
+        Update object id attribute using the primary key value of new row.
+        Save the object in local dictionary using table row's PK as dictionary key"""
+        with invalidating(self.table):
+            cursor = get_connection().execute(self.sql["insert"], self.row_values())
+            commit()
+
+        self.id = cursor.lastrowid
+        type(self).all[self.id] = self
+        forget_on_rollback(self)
+
+    @classmethod
+    def create(cls, *args, **kwargs):
+        """ Initialize a new instance and save the object to the database """
+        obj = cls(*args, **kwargs)
+        obj.save()
+        return obj
+
+    @classmethod
+    def from_rows(cls, rows):
+        """ Initialize an unsaved instance per tuple or dict of column values in rows """
+        return [cls(**row) if isinstance(row, dict) else cls(*row) for row in rows]
+
+    @classmethod
+    def create_many(cls, rows):
+        """ Initialize an instance per tuple or dict of column values in rows and
+        insert them all with a single executemany and a single commit.
+        Return the list of saved objects"""
+        return cls.insert_many(cls.from_rows(rows))
+
+    @classmethod
+    @instrumented("insert_many")
+    def insert_many(cls, objects):
+        """ Insert the unsaved objects in one transaction and assign their ids """
+        if not objects:
+            return objects
+
+        with invalidating(cls.table), transaction(), deferred_search_index(cls.table, cls.search_columns, len(objects)):
+            conn = get_connection()
+            conn.executemany(cls.sql["insert"], [obj.row_values() for obj in objects])
+            last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+        # Rows inserted back to back in one transaction receive consecutive primary keys
+        for id, obj in enumerate(objects, start=last_id - len(objects) + 1):
+            obj.id = id
+            cls.all[id] = obj
+            forget_on_rollback(obj)
+        return objects
+
+    @classmethod
+    @instrumented("upsert_many")
+    def upsert_many(cls, rows):
+        """ Insert or update a row per (id, *column values) tuple or dict in rows, all in one transaction.
+        Rows with an id go through a single executemany of INSERT ... ON CONFLICT (id) DO UPDATE,
+        rows without one are inserted as new rows. The column values are validated like in create_many.
+        Loaded objects with an upserted id are updated in place. Return the list of objects in row order"""
+        rows = [dict(row) if isinstance(row, dict) else dict(zip(("id", *cls.columns), row)) for row in rows]
+        ids = [row.pop("id", None) for row in rows]
+        objects = cls.from_rows(rows)
+
+        with invalidating(cls.table), transaction():
+            get_connection().executemany(
+                cls.sql["upsert"],
+                [(id,) + obj.row_values() for id, obj in zip(ids, objects) if id is not None])
+            cls.insert_many([obj for id, obj in zip(ids, objects) if id is None])
+
+            result = []
+            for id, obj in zip(ids, objects):
+                loaded = cls.all.get(id) if id is not None else None
+                if loaded is not None:
+                    restore_on_rollback(loaded)
+                    for attribute in cls.storage_attributes:
+                        setattr(loaded, attribute, getattr(obj, attribute))
+                    obj = loaded
+                elif id is not None:
+                    obj.id = id
+                    obj = cls.all.setdefault(id, obj)
+                    forget_on_rollback(obj)
+                result.append(obj)
+        return result
+
+    @classmethod
+    @instrumented("bulk_update")
+    def bulk_update(cls, where, values, all=False):
+        """ Set the columns in values on every row matching all the column -> value pairs in where,
+        with a single UPDATE statement, and return the number of updated rows.
+        An empty where only updates every row with all=True.
+        The new values are validated once by the property setters instead of once per row,
+        and the loaded objects of the updated rows are updated in place"""
+        if set(where) - {"id"} - set(cls.columns):
+            raise ValueError(f"{cls.__name__} columns to match must be among id, {', '.join(cls.columns)}")
+        if set(values) - set(cls.columns) or not values:
+            raise ValueError(f"{cls.__name__} columns to update must be among {', '.join(cls.columns)}")
+        if not where and not all:
+            raise ValueError(f"Pass all=True to update every {cls.__name__} row")
+
+        # Run the setters on a blank object and keep the values they store
+        probe = cls.__new__(cls)
+        for column, value in values.items():
+            setattr(probe, column, value)
+        changes = {storage_attribute(cls, column): getattr(probe, storage_attribute(cls, column)) for column in values}
+
+        sql = f"""
+            UPDATE {cls.table}
+            SET {", ".join(f"{column} = ?" for column in values)}
+            WHERE {" AND ".join(f"{column} IS ?" for column in where) or "1"}
+            RETURNING id
+        """
+
+        with invalidating(cls.table), transaction():
+            ids = get_connection().execute(sql, tuple(changes.values()) + tuple(where.values())).fetchall()
+            for (id,) in ids:
+                obj = cls.all.get(id)
+                if obj is not None:
+                    restore_on_rollback(obj)
+                    for attribute, value in changes.items():
+                        setattr(obj, attribute, value)
+        return len(ids)
+
+    @classmethod
+    def ids(cls):
+        """Return a set containing the primary key of every row in the table"""
+        return {row[0] for row in cached_fetchall(cls.sql["ids"], (), (cls.table,))}
+
+    @instrumented("update")
+    def update(self, *values):
+        """Assign the column values, in column order, and update the table row of the current object."""
+        restore_on_rollback(self)
+        for column, value in zip(self.columns, values):
+            setattr(self, column, value)
+        with invalidating(self.table):
+            get_connection().execute(self.sql["update"], self.row_values() + (self.id,))
+            commit()
+        return self
+
+    @instrumented("delete")
+    def delete(self):
+        """Delete the table row corresponding to the current object,
+        delete the dictionary entry, and reassign id attribute"""
+        restore_on_rollback(self)
+        with invalidating(self.table):
+            get_connection().execute(self.sql["delete"], (self.id,))
+            commit()
+
+        # Delete the dictionary entry using id as the key
+        del type(self).all[self.id]
+
+        # Set the id to None
+        self.id = None
+
+        return self
+
+    @classmethod
+    @instrumented("get_all", reads=True)
+    def get_all(cls, records=False, **options):
+        """Return a list containing an object per row in the table, or a record per row with records=True.
+        with_<name>=True loads the related objects declared in joins by the same query"""
+        join = cls.join_from_options(options)
+        rows = cached_fetchall(cls.queries[join]["select"], (), cls.tables_of(join))
+        return list(map(cls.readers[(join, records)], rows))
+
+    @classmethod
+    def iter_all(cls, batch_size=1000, records=False, **options):
+        """Yield an object per row in the table, fetching batch_size rows at a time.
+        The rows are read through a dedicated cursor, so other queries can run while iterating"""
+        join = cls.join_from_options(options)
+        from_db = cls.readers[(join, records)]
+        cursor = get_connection().execute(cls.queries[join]["select"])
+        for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+            for row in rows:
+                yield from_db(row)
+
+    @classmethod
+    @instrumented("page", reads=True)
+    def page(cls, after_id=None, before_id=None, limit=50, records=False, **options):
+        """Return up to limit objects in id order, starting after after_id,
+        or the limit objects right before before_id when it is given.
+        Pages seek on the primary key instead of using OFFSET, so every page
+        costs the same no matter how deep into the table it is"""
+        join = cls.join_from_options(options)
+        queries = cls.queries[join]
+        if before_id is not None:
+            sql, params = queries["previous_page"], (before_id, limit)
+        elif after_id is not None:
+            sql, params = queries["next_page"], (after_id, limit)
+        else:
+            sql, params = queries["first_page"], (limit,)
+
+        rows = cached_fetchall(sql, params, cls.tables_of(join))
+        if before_id is not None:
+            rows = rows[::-1]
+        return list(map(cls.readers[(join, records)], rows))
+
+    @classmethod
+    @instrumented("find_by_id", reads=True)
+    def find_by_id(cls, id):
+        """Return the object corresponding to the table row matching the specified primary key"""
+        row = cached_fetchone(cls.sql["find_by_id"], (id,), (cls.table,))
+        return cls.instance_from_db(row) if row else None
+
+    @classmethod
+    @instrumented("find_by", reads=True)
+    def find_by(cls, column, value):
+        """Return the object corresponding to the first table row whose column matches value"""
+        row = cached_fetchone(cls.sql["find_by"][column], (value,), (cls.table,))
+        return cls.instance_from_db(row) if row else None
+
+    @classmethod
+    @instrumented("search", reads=True)
+    def search(cls, text, limit=20, columns=None, records=False, **options):
+        """Return up to limit objects whose search columns contain text, best matches first.
+        Terms of three or more characters are looked up in the <table>_fts trigram index,
+        shorter terms fall back to a LIKE scan of the table"""
+        columns = columns or cls.search_columns
+        if not set(columns) <= set(cls.search_columns):
+            raise ValueError(f"{cls.__name__}s can only be searched by {', '.join(cls.search_columns)}")
+        join = cls.join_from_options(options)
+
+        if uses_search_index(text):
+            sql = cls.queries[join]["search"]
+            params = (match_expression(text, columns), limit)
+        else:
+            conditions = " OR ".join(f"{cls.table}.{column} LIKE ? ESCAPE '\\'" for column in columns)
+            sql = f"""
+                {cls.queries[join]["select"]}
+                WHERE {conditions}
+                LIMIT ?
+            """
+            params = (like_pattern(text),) * len(columns) + (limit,)
+
+        rows = get_connection().execute(sql, params).fetchall()
+        return list(map(cls.readers[(join, records)], rows))
@@ -0,0 +1,144 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from models.connection import get_connection
+
+# Number of query results each thread keeps, override with HOTEL_QUERY_CACHE_SIZE (0 disables the cache)
+DEFAULT_MAXSIZE = int(os.environ.get("HOTEL_QUERY_CACHE_SIZE", 256))
+
+# Results with more rows are not kept, so listing a large table does not pin it in memory
+MAX_ROWS = 10000
+
+# Seconds a hit may go without checking for commits by other connections and schema changes.
+# 0, the default, checks before every hit. The check costs about as much as a primary key lookup,
+# a larger HOTEL_QUERY_CACHE_CHECK_INTERVAL trades that for reads up to that many seconds stale
+CHECK_INTERVAL = float(os.environ.get("HOTEL_QUERY_CACHE_CHECK_INTERVAL", 0))
+
+# One statement reading both the data version (moved by commits of other connections)
+# and the schema version (moved by any schema change, this connection's included)
+VERSIONS_SQL = "SELECT data_version, schema_version FROM pragma_data_version, pragma_schema_version"
+
+# Table name -> version, incremented by the model writes
+_versions = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def bump(tables):
+    """Increment the version of tables, making the results read from them stale"""
+    with _lock:
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+
+
+class QueryCache:
+    """ Least recently used results of the read queries run on one connection, keyed by (sql, params).
+    Every entry remembers the version of the tables it was read from. The model writes run in an
+    invalidating() block that increments the version of the tables they change when it exits,
+    which makes the older entries stale. Changes the models do not account for empty the cache:
+    a change of total_changes means rows changed by other SQL on this connection, a change of
+    PRAGMA data_version a commit from another connection (another thread or process) and a change
+    of PRAGMA schema_version a schema change. Both pragmas are read before an entry is returned.
+    Queries inside an open transaction bypass the cache, they may see uncommitted rows."""
+
+    def __init__(self, conn, maxsize=DEFAULT_MAXSIZE, max_rows=MAX_ROWS, check_interval=CHECK_INTERVAL):
+        self.conn = conn
+        self.maxsize = maxsize
+        self.max_rows = max_rows
+        self.check_interval = check_interval
+        self.entries = OrderedDict()
+        self.changes = conn.total_changes
+        self.versions = conn.execute(VERSIONS_SQL).fetchone()
+        self.checked = time.monotonic()
+        # Depth of the invalidating() blocks open on the connection
+        self.writing = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"<QueryCache size={len(self.entries)} maxsize={self.maxsize} hits={self.hits} misses={self.misses}>"
+
+    def clear(self):
+        self.entries.clear()
+
+    def is_current(self):
+        """ Return False, after emptying the cache, when another connection committed or the schema
+        changed since the last check. With a check_interval the pragmas are only read that often"""
+        now = time.monotonic()
+        if self.check_interval and now - self.checked < self.check_interval:
+            return True
+        self.checked = now
+        versions = self.conn.execute(VERSIONS_SQL).fetchone()
+        if versions == self.versions:
+            return True
+        self.versions = versions
+        self.entries.clear()
+        return False
+
+    def fetch(self, sql, params, tables, one=False):
+        """Return the rows of sql run with params (the first row or None with one=True),
+        from the cache when none of tables was written since they were read"""
+        conn = self.conn
+        if self.maxsize == 0 or conn.in_transaction:
+            cursor = conn.execute(sql, params)
+            return cursor.fetchone() if one else cursor.fetchall()
+
+        if conn.total_changes != self.changes:
+            self.changes = conn.total_changes
+            self.entries.clear()
+        key = (sql, params, one)
+        versions = tuple(_versions.get(table, 0) for table in tables)
+        entry = self.entries.get(key)
+        # Misses run the query alone, the versions are only checked before returning an entry
+        if entry is not None and entry[0] == versions and self.is_current():
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        cursor = conn.execute(sql, params)
+        result = cursor.fetchone() if one else cursor.fetchall()
+        if one or len(result) <= self.max_rows:
+            self.entries[key] = (versions, result)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return result
+
+
+def get_cache():
+    """Return the query cache of the calling thread's connection"""
+    conn = get_connection()
+    cache = getattr(_local, "cache", None)
+    if cache is None or cache.conn is not conn:
+        cache = _local.cache = QueryCache(conn)
+    return cache
+
+
+def cached_fetchall(sql, params=(), tables=()):
+    """Return the list of rows of sql, cached until one of tables is written. The list must not be modified"""
+    return get_cache().fetch(sql, params, tables)
+
+
+def cached_fetchone(sql, params=(), tables=()):
+    """Return the first row of sql or None, cached until one of tables is written"""
+    return get_cache().fetch(sql, params, tables, one=True)
+
+
+@contextmanager
+def invalidating(*tables):
+    """ Make the cached results read from tables stale once the block, which writes to them, exits.
+    Other threads see the write through data_version once it commits.
+    The outermost block empties the cache first when SQL the models do not account for changed rows"""
+    cache = get_cache()
+    if not cache.writing and cache.conn.total_changes != cache.changes:
+        cache.clear()
+    cache.writing += 1
+    try:
+        yield
+    finally:
+        cache.writing -= 1
+        bump(tables)
+        cache.changes = cache.conn.total_changes
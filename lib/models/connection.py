@@ -0,0 +1,111 @@
+import os
+import sqlite3
+import threading
+import weakref
+
+# lib/hotel.db, so the database no longer depends on the working directory
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hotel.db")
+
+# Pragmas applied to every new connection, tuned for a local single-writer workload
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,       # 64 MB page cache (negative values are KiB)
+    "mmap_size": 268435456,     # 256 MB of the file memory mapped
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,       # milliseconds to wait on a locked database
+}
+
+
+class ThreadConnection:
+    """The connection of one thread and its shared cursor, held in the thread's local storage"""
+
+    __slots__ = ("conn", "cursor", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = None
+
+
+class ConnectionManager:
+    """ Hand out one SQLite connection per thread for the database at path.
+    The path defaults to the HOTEL_DB_PATH environment variable, then DEFAULT_PATH.
+    Connections are opened on first use in each thread, configured with pragmas and
+    closed once the thread ends, when its local storage is freed.
+    factory is the sqlite3.Connection subclass (or callable) passed on to sqlite3.connect."""
+
+    def __init__(self, path=None, pragmas=None, factory=sqlite3.Connection):
+        self.path = path or os.environ.get("HOTEL_DB_PATH", DEFAULT_PATH)
+        self.pragmas = dict(PRAGMAS if pragmas is None else pragmas)
+        self.factory = factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def __repr__(self):
+        return f"<ConnectionManager {self.path} connections={len(self._connections)}>"
+
+    def connect(self):
+        """Open a new connection to the database and apply the pragma profile"""
+        conn = sqlite3.connect(self.path, check_same_thread=False, factory=self.factory)
+        for pragma, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        return conn
+
+    def connection(self):
+        """Return the connection of the calling thread, opening it on first use"""
+        held = getattr(self._local, "held", None)
+        if held is None:
+            held = self._local.held = ThreadConnection(self.connect())
+            with self._lock:
+                self._connections.add(held.conn)
+            weakref.finalize(held, self.release, held.conn)
+        return held.conn
+
+    def cursor(self):
+        """Return a cursor on the connection of the calling thread, shared by every caller in that thread"""
+        conn = self.connection()
+        held = self._local.held
+        if held.cursor is None:
+            held.cursor = conn.cursor()
+        return held.cursor
+
+    def release(self, conn):
+        """Close conn, the connection of a thread that ended"""
+        with self._lock:
+            self._connections.discard(conn)
+        conn.close()
+
+    def close_all(self):
+        """Close the connections of every thread"""
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+_manager = ConnectionManager()
+
+
+def configure(path=None, pragmas=None, factory=sqlite3.Connection):
+    """Point the models at the database at path, closing the connections to the previous one"""
+    global _manager
+    _manager.close_all()
+    _manager = ConnectionManager(path, pragmas, factory)
+    return _manager
+
+
+def get_manager():
+    """Return the connection manager the models use"""
+    return _manager
+
+
+def get_connection():
+    """Return the connection of the calling thread"""
+    return _manager.connection()
+
+
+def get_cursor():
+    """Return the shared cursor of the calling thread"""
+    return _manager.cursor()
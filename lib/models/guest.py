@@ -1,9 +1,34 @@
-from models.__init__ import CURSOR, CONN 
+from models.aio import run_in_db_thread
+from models.base import Model
+from models.connection import get_connection
+from models.records import GuestRecord
 from models.hotel import Hotel
 
-class Guest:
-    
-    all = {}
+class Guest(Model):
+
+    table = "guests"
+    columns = {
+        "name": "TEXT",
+        "hotel_id": "INT",
+    }
+    constraints = ("FOREIGN KEY (hotel_id) REFERENCES hotels(id)",)
+    record = GuestRecord
+
+    # Columns indexed for full-text search by search()
+    search_columns = ("name",)
+
+    # Secondary indexes created along with the table: index name -> indexed columns
+    indexes = {
+        "guests_hotel_id_idx": "hotel_id",
+        "guests_name_idx": "name",
+        "guests_name_length_idx": "length(name)",
+    }
+
+    # Listing methods take with_hotel=True to load the hotels by the same query
+    joins = {"hotel": Hotel}
+
+    # Hotel object attached by the hotel property, the hotel_id setter or an eager load
+    _hotel = None
     
     def __init__(self, name, hotel_id, id=None):
         self.id = id
@@ -27,154 +52,145 @@ class Guest:
     
     @hotel_id.setter
     def hotel_id(self, hotel_id):
-        if isinstance(hotel_id, int) and Hotel.find_by_id(hotel_id):
+        hotel = Hotel.find_by_id(hotel_id) if isinstance(hotel_id, int) else None
+        if hotel:
             self._hotel_id = hotel_id
+            self._hotel = hotel
         else: 
             raise ValueError("Hotel ID must reference a hotel in the database. Create the hotel first.")
+
+    @property
+    def hotel(self):
+        """Return the Hotel the guest is staying at, querying it only when no matching hotel is attached"""
+        hotel = self._hotel
+        if hotel is None or hotel.id != self._hotel_id:
+            hotel = self._hotel = Hotel.find_by_id(self._hotel_id)
+        return hotel
         
     def __repr__(self):
         return (
             f"<Guest {self.id}: {self.name}> -- "
-            f"{Hotel.find_by_id(self.hotel_id)}"
+            f"{self.hotel}"
         )
     
     def __str__(self):
         return (
             f"<Guest {self.id}: {self.name}> -- "
-            f"{Hotel.find_by_id(self.hotel_id)}"
+            f"{self.hotel}"
         )
 
-    @classmethod
-    def create_table(cls):
-        """ Create a new table to persist the attributes of Employee instances """
-        sql = """
-            CREATE TABLE IF NOT EXISTS guests (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            hotel_id INT,
-            FOREIGN KEY (hotel_id) REFERENCES hotels(id))
-        """
-        CURSOR.execute(sql)
-        CONN.commit()
+    def update(self, name, hotel_id):
+        """Update the table row corresponding to the current Guest instance."""
+        return super().update(name, hotel_id)
 
     @classmethod
-    def drop_table(cls):
-        """ Drop the table that persists Employee instances """
-        sql = """
-            DROP TABLE IF EXISTS guests;
+    def compile_sql(cls):
+        """ Build the model statements plus the set-based statements run on the guests of one hotel """
+        super().compile_sql()
+        cls.sql["delete_by_hotel"] = """
+            DELETE FROM guests
+            WHERE hotel_id = ?
         """
-        CURSOR.execute(sql)
-        CONN.commit()
-
-    def save(self):
-        """ Insert a new row with the name, job title, and department id values of the current Employee object.
-        Update object id attribute using the primary key value of new row.
-        Save the object in local dictionary using table row's PK as dictionary key"""
-        sql = """
-                INSERT INTO guests (name, hotel_id)
-                VALUES (?, ?)
+        cls.sql["clear_hotel"] = """
+            UPDATE guests
+            SET hotel_id = NULL
+            WHERE hotel_id = ?
         """
 
-        CURSOR.execute(sql, (self.name, self.hotel_id))
-        CONN.commit()
+    @classmethod
+    def cached_for_hotel(cls, hotel_id):
+        """Return the loaded Guest objects of the hotel, from the identity map without querying"""
+        return [guest for guest in cls.all.values() if guest._hotel_id == hotel_id]
 
-        self.id = CURSOR.lastrowid
-        type(self).all[self.id] = self
+    @classmethod
+    def from_rows(cls, rows):
+        """ Initialize an unsaved Guest instance per (name, hotel_id) tuple or dict in rows.
+        Hotel ids are checked against one query of the hotels table instead of one per guest"""
+        hotel_ids = Hotel.ids()
+        guests = []
+        for row in rows:
+            name, hotel_id = (row["name"], row["hotel_id"]) if isinstance(row, dict) else row
+            if not (isinstance(hotel_id, int) and hotel_id in hotel_ids):
+                raise ValueError("Hotel ID must reference a hotel in the database. Create the hotel first.")
+            guest = cls.__new__(cls)
+            guest.id = None
+            guest.name = name
+            guest._hotel_id = hotel_id
+            guests.append(guest)
+        return guests
 
-    def update(self, name, hotel_id):
-        """Update the table row corresponding to the current Employee instance."""
-        sql = """
-            UPDATE guests
-            SET name = ?, hotel_id = ?
-            WHERE id = ?
-        """
-        self.name = name
-        self.hotel_id = hotel_id
-        CURSOR.execute(sql, (self.name, self.hotel_id, self.id))
-        CONN.commit()
-        return self
+    @classmethod
+    def reassign_hotel(cls, from_id, to_id):
+        """Move every guest of hotel from_id to hotel to_id with one UPDATE and return the number of guests moved"""
+        return cls.bulk_update(where={"hotel_id": from_id}, values={"hotel_id": to_id})
 
-    def delete(self):
-        """Delete the table row corresponding to the current Employee instance,
-        delete the dictionary entry, and reassign id attribute"""
+    @classmethod
+    def find_by_name(cls, name):
+        """Return a Guest object corresponding to first table row matching specified name"""
+        return cls.find_by("name", name)
 
-        sql = """
-            DELETE FROM guests
-            WHERE id = ?
-        """
+    @classmethod
+    def find_by_name_length(cls, length, with_hotel=False, records=False):
+        """Return a list of guests whose name length is less than or equal to the length parameter"""
 
-        CURSOR.execute(sql, (self.id,))
-        CONN.commit()
+        return cls.find_by_name_length_between(0, length, with_hotel, records)
 
-        # Delete the dictionary entry using id as the key
-        del type(self).all[self.id]
+    @classmethod
+    def find_by_name_length_between(cls, min_length, max_length, with_hotel=False, records=False):
+        """Return a list of guests whose name length is between min_length and max_length inclusive"""
 
-        # Set the id to None
-        self.id = None
-        
+        return list(cls.iter_by_name_length_between(min_length, max_length, with_hotel=with_hotel, records=records))
 
     @classmethod
-    def create(cls, name, hotel_id):
-        """ Initialize a new Employee instance and save the object to the database """
-        guest = cls(name, hotel_id)
-        guest.save()
-        return guest
+    def iter_by_name_length(cls, length, batch_size=1000, with_hotel=False, records=False):
+        """Yield the guests whose name length is less than or equal to the length parameter"""
+
+        return cls.iter_by_name_length_between(0, length, batch_size, with_hotel, records)
 
     @classmethod
-    def instance_from_db(cls, row):
-        """Return an Employee object having the attribute values from the table row."""
-
-        # Check the dictionary for  existing instance using the row's primary key
-        guest = cls.all.get(row[0])
-        if guest:
-            # ensure attributes match row values in case local instance was modified
-            guest.name = row[1]
-            guest.hotel_id= row[2]
+    def iter_by_name_length_between(cls, min_length, max_length, batch_size=1000, with_hotel=False, records=False):
+        """Yield the guests whose name length is between min_length and max_length inclusive.
+        The filter runs in SQL against the guests_name_length_idx expression index"""
+        if with_hotel:
+            sql = """
+                SELECT guests.*, hotels.*
+                FROM guests
+                LEFT JOIN hotels ON hotels.id = guests.hotel_id
+                WHERE length(guests.name) BETWEEN ? AND ?
+                ORDER BY guests.id
+            """
         else:
-            # not in dictionary, create new instance and add to dictionary
-            guest = cls(row[1], row[2])
-            guest.id = row[0]
-            cls.all[guest.id] = guest
-        return guest
+            sql = """
+                SELECT *
+                FROM guests
+                WHERE length(name) BETWEEN ? AND ?
+                ORDER BY id
+            """
+
+        from_db = cls.reader(records, with_hotel=with_hotel)
+        cursor = get_connection().execute(sql, (min_length, max_length))
+        for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+            for row in rows:
+                yield from_db(row)
 
     @classmethod
-    def get_all(cls):
-        """Return a list containing one Employee object per table row"""
-        sql = """
-            SELECT *
-            FROM guests
-        """
-
-        rows = CURSOR.execute(sql).fetchall()
+    def count_by_name_length(cls, length):
+        """Return the number of guests whose name length is less than or equal to the length parameter"""
 
-        return [cls.instance_from_db(row) for row in rows]
+        return cls.count_by_name_length_between(0, length)
 
     @classmethod
-    def find_by_id(cls, id):
-        """Return Employee object corresponding to the table row matching the specified primary key"""
+    def count_by_name_length_between(cls, min_length, max_length):
+        """Return the number of guests whose name length is between min_length and max_length inclusive"""
         sql = """
-            SELECT *
+            SELECT count(*)
             FROM guests
-            WHERE id = ?
+            WHERE length(name) BETWEEN ? AND ?
         """
 
-        row = CURSOR.execute(sql, (id,)).fetchone()
-        return cls.instance_from_db(row) if row else None
-
-    @classmethod
-    def find_by_name(cls, name):
-        """Return Employee object corresponding to first table row matching specified name"""
-        sql = """
-            SELECT *
-            FROM guests
-            WHERE name is ?
-        """
+        return get_connection().execute(sql, (min_length, max_length)).fetchone()[0]
 
-        row = CURSOR.execute(sql, (name,)).fetchone()
-        return cls.instance_from_db(row) if row else None
-    
     @classmethod
-    def find_by_name_length(cls, length):
-        """Return a list of guests whose name length is less than or equal to the length parameter"""
-
-        return [guest for guest in cls.get_all() if len(guest.name) <= length]
\ No newline at end of file
+    async def afind_by_name_length(cls, length, with_hotel=False, records=False):
+        """Asynchronous find_by_name_length(), run on the database executor"""
+        return await run_in_db_thread(cls.find_by_name_length, length, with_hotel, records)
@@ -1,8 +1,29 @@
-from models.__init__ import CURSOR, CONN 
-
-class Hotel:
-    
-    all = {}
+from models.aio import aiterate, run_in_db_thread
+from models.base import Model
+from models.cache import invalidating
+from models.connection import get_connection
+from models.records import HotelRecord
+from models.transaction import transaction, restore_on_rollback
+
+# What Hotel.delete() does with the guests of the hotel
+DELETE_MODES = ("keep", "restrict", "cascade", "set_null")
+
+class Hotel(Model):
+
+    table = "hotels"
+    columns = {
+        "name": "TEXT",
+        "location": "TEXT",
+    }
+    record = HotelRecord
+
+    # Columns indexed for full-text search by search()
+    search_columns = ("name", "location")
+
+    # Secondary indexes created along with the table: index name -> indexed columns
+    indexes = {
+        "hotels_name_idx": "name",
+    }
     
     def __init__(self, name, location, id=None):
         self.id = id
@@ -42,134 +63,120 @@ class Hotel:
             f"<Hotel {self.id}: {self.name} @{self.location}>"
         )
         
-    @classmethod
-    def create_table(cls):
-        """ Create a new table to persist the attributes of Hotel instances """
-        sql = """
-            CREATE TABLE IF NOT EXISTS hotels (
-            id INTEGER PRIMARY KEY,
-            name TEXT,
-            location TEXT)
-        """
-        CURSOR.execute(sql)
-        CONN.commit()
-
-    @classmethod
-    def drop_table(cls):
-        """ Drop the table that persists Hotel instances """
-        sql = """
-            DROP TABLE IF EXISTS hotels;
-        """
-        CURSOR.execute(sql)
-        CONN.commit()
+    def update(self, name, location):
+        """Update the table row corresponding to the current Hotel instance."""
+        return super().update(name, location)
 
-    def save(self):
-        """ Insert a new row with the name and location values of the current Hotel instance.
-        Update object id attribute using the primary key value of new row.
-        Save the object in local dictionary using table row's PK as dictionary key"""
+    def delete(self, mode="keep"):
+        """Delete the table row corresponding to the current Hotel instance. mode decides what happens to its guests:
+        "keep" leaves them as they are, "restrict" refuses to delete a hotel that still has guests,
+        "cascade" deletes them too and "set_null" keeps them with a NULL hotel_id. The guests are deleted or updated by a single
+        statement in the same transaction as the hotel, and the loaded Guest objects are updated to match"""
+        from models.guest import Guest
+        if mode not in DELETE_MODES:
+            raise ValueError(f"Delete mode must be one of {', '.join(DELETE_MODES)}")
+
+        with invalidating(self.table, Guest.table), transaction():
+            # Without a guests table there are no guests to look after
+            guests_table = mode != "keep" and get_connection().execute(Guest.sql["table_exists"]).fetchone() is not None
+            if guests_table and mode == "restrict":
+                if self.count_guests():
+                    raise ValueError("Hotel still has guests. Delete them first or use the cascade mode.")
+            elif guests_table and mode == "cascade":
+                get_connection().execute(Guest.sql["delete_by_hotel"], (self.id,))
+                for guest in Guest.cached_for_hotel(self.id):
+                    restore_on_rollback(guest)
+                    Guest.all.pop(guest.id, None)
+                    guest.id = None
+            elif guests_table and mode == "set_null":
+                get_connection().execute(Guest.sql["clear_hotel"], (self.id,))
+                for guest in Guest.cached_for_hotel(self.id):
+                    restore_on_rollback(guest)
+                    guest._hotel_id = None
+                    guest._hotel = None
+            return super().delete()
+
+    def count_guests(self):
+        """Return the number of guests associated with current hotel"""
         sql = """
-            INSERT INTO hotels (name, location)
-            VALUES (?, ?)
+            SELECT count(*) FROM guests
+            WHERE hotel_id = ?
         """
-
-        CURSOR.execute(sql, (self.name, self.location))
-        CONN.commit()
-
-        self.id = CURSOR.lastrowid
-        type(self).all[self.id] = self
+        return get_connection().execute(sql, (self.id,)).fetchone()[0]
 
     @classmethod
-    def create(cls, name, location):
-        """ Initialize a new Hotel instance and save the object to the database """
-        hotel = cls(name, location)
-        hotel.save()
-        return hotel
-
-    def update(self, name, location):
-        """Update the table row corresponding to the current Hotel instance."""
+    def guest_counts(cls, records=False):
+        """Return a (hotel, number of guests) pair per hotel in id order, hotels without guests included.
+        The guests are counted by SQL over the guests_hotel_id_idx index, no Guest object is loaded"""
         sql = """
-            UPDATE hotels
-            SET name = ?, location = ?
-            WHERE id = ?
+            SELECT hotels.*, coalesce(counts.guest_count, 0)
+            FROM hotels
+            LEFT JOIN (
+                SELECT hotel_id, count(*) AS guest_count
+                FROM guests
+                GROUP BY hotel_id
+            ) AS counts ON counts.hotel_id = hotels.id
+            ORDER BY hotels.id
         """
-        self.name = name
-        self.location = location 
-        CURSOR.execute(sql, (self.name, self.location, self.id))
-        CONN.commit()
-        return self
 
-    def delete(self):
-        """Delete the table row corresponding to the current Hotel instance,
-        delete the dictionary entry, and reassign id attribute"""  
+        from_db = cls.reader(records)
+        # The hotel columns come first, the guest count follows them
+        width = len(cls.columns) + 1
+        return [(from_db(row[:width]), row[width]) for row in get_connection().execute(sql)]
 
+    @classmethod
+    def most_occupied(cls, limit=10, records=False):
+        """Return the (hotel, number of guests) pairs of the limit hotels with the most guests, most first"""
         sql = """
-            DELETE FROM hotels
-            WHERE id = ?
+            SELECT hotels.*, counts.guest_count
+            FROM (
+                SELECT hotel_id, count(*) AS guest_count
+                FROM guests
+                GROUP BY hotel_id
+            ) AS counts
+            JOIN hotels ON hotels.id = counts.hotel_id
+            ORDER BY counts.guest_count DESC, hotels.id
+            LIMIT ?
         """
 
-        CURSOR.execute(sql, (self.id,))
-        CONN.commit()
-
-        # Delete the dictionary entry using id as the key
-        del type(self).all[self.id]
-
-        # Set the id to None
-        self.id = None
-        
-        return self
-
-    @classmethod
-    def instance_from_db(cls, row):
-        """Return a Hotel object having the attribute values from the table row."""
-
-        # Check the dictionary for an existing instance using the row's primary key
-        hotel = cls.all.get(row[0])
-        if hotel:
-            # ensure attributes match row values in case local instance was modified
-            hotel.name = row[1]
-            hotel.location = row[2]
-        else:
-            # not in dictionary, create new instance and add to dictionary
-            hotel = cls(row[1], row[2])
-            hotel.id = row[0]
-            cls.all[hotel.id] = hotel
-        return hotel
+        from_db = cls.reader(records)
+        # The hotel columns come first, the guest count follows them
+        width = len(cls.columns) + 1
+        return [(from_db(row[:width]), row[width]) for row in get_connection().execute(sql, (limit,))]
 
     @classmethod
-    def get_all(cls):
-        """Return a list containing a Hotel object per row in the table"""
+    def without_guests(cls, records=False):
+        """Return the hotels that have no guests, in id order"""
         sql = """
             SELECT *
             FROM hotels
+            WHERE NOT EXISTS (
+                SELECT 1 FROM guests
+                WHERE guests.hotel_id = hotels.id
+            )
+            ORDER BY id
         """
 
-        rows = CURSOR.execute(sql).fetchall()
-
-        return [cls.instance_from_db(row) for row in rows]
+        return list(map(cls.reader(records), get_connection().execute(sql)))
 
     @classmethod
-    def find_by_id(cls, id):
-        """Return a Hotel object corresponding to the table row matching the specified primary key"""
+    def occupancy(cls):
+        """Return a dictionary with the number of hotels, guests and hotels without guests, computed by one query"""
         sql = """
-            SELECT *
-            FROM hotels
-            WHERE id = ?
+            SELECT
+                (SELECT count(*) FROM hotels),
+                (SELECT count(*) FROM guests),
+                (SELECT count(*) FROM hotels
+                 WHERE NOT EXISTS (SELECT 1 FROM guests WHERE guests.hotel_id = hotels.id))
         """
 
-        row = CURSOR.execute(sql, (id,)).fetchone()
-        return cls.instance_from_db(row) if row else None
+        hotels, guests, empty = get_connection().execute(sql).fetchone()
+        return {"hotels": hotels, "guests": guests, "hotels_without_guests": empty}
 
     @classmethod
     def find_by_name(cls, name):
         """Return a Hotel object corresponding to first table row matching specified name"""
-        sql = """
-            SELECT *
-            FROM hotels
-            WHERE name is ?
-        """
-
-        row = CURSOR.execute(sql, (name,)).fetchone()
-        return cls.instance_from_db(row) if row else None
+        return cls.find_by("name", name)
 
     def guests(self):
         """Return list of guests associated with current hotel"""
@@ -178,7 +185,31 @@ class Hotel:
             SELECT * FROM guests
             WHERE hotel_id = ?
         """
-        CURSOR.execute(sql, (self.id,),)
+        rows = get_connection().execute(sql, (self.id,)).fetchall()
+        guests = [Guest.instance_from_db(row) for row in rows]
+        for guest in guests:
+            guest._hotel = self
+        return guests
+
+    def iter_guests(self, batch_size=1000):
+        """Yield the guests associated with current hotel, fetching batch_size rows at a time"""
+        from models.guest import Guest
+        sql = """
+            SELECT * FROM guests
+            WHERE hotel_id = ?
+        """
+
+        cursor = get_connection().execute(sql, (self.id,))
+        for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+            for row in rows:
+                guest = Guest.instance_from_db(row)
+                guest._hotel = self
+                yield guest
+
+    async def aguests(self):
+        """Asynchronous guests(), run on the database executor"""
+        return await run_in_db_thread(self.guests)
 
-        rows = CURSOR.fetchall()
-        return [Guest.instance_from_db(row) for row in rows]
\ No newline at end of file
+    def aiter_guests(self, batch_size=1000):
+        """Asynchronously iterate over the guests associated with current hotel, see iter_guests()"""
+        return aiterate(lambda: self.iter_guests(batch_size), batch_size)
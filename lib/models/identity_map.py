@@ -0,0 +1,112 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+# Number of recently used objects each map keeps alive, override with HOTEL_IDENTITY_MAP_SIZE
+DEFAULT_MAXSIZE = int(os.environ.get("HOTEL_IDENTITY_MAP_SIZE", 1024))
+
+
+class IdentityMap:
+    """ Map table row primary keys to the model objects loaded from them.
+    Every object is held through a weak reference, so a row keeps resolving to
+    the same object for as long as the program still uses that object.
+    On top of that the maxsize most recently used objects are held strongly, so
+    objects that are read again soon are not reloaded. Less recently used objects
+    are evicted from that list and freed once nothing else refers to them.
+    maxsize=None holds every object strongly, maxsize=0 holds none.
+    The map may be shared by the threads of the database executor."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._refs = weakref.WeakValueDictionary()
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return f"<IdentityMap size={len(self)} maxsize={self.maxsize}>"
+
+    def _touch(self, id, obj):
+        """Mark obj as the most recently used object, evicting the least recently used one when full"""
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._recent[id] = obj
+            self._recent.move_to_end(id)
+            if self.maxsize is not None and len(self._recent) > self.maxsize:
+                self._recent.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, id, default=None):
+        """Return the object loaded from the row with primary key id, or default when it is not mapped"""
+        obj = self._refs.get(id)
+        if obj is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._touch(id, obj)
+        return obj
+
+    def __getitem__(self, id):
+        obj = self.get(id)
+        if obj is None:
+            raise KeyError(id)
+        return obj
+
+    def __setitem__(self, id, obj):
+        self._refs[id] = obj
+        self._touch(id, obj)
+
+    def setdefault(self, id, obj):
+        """Map id to obj unless another object is already mapped to it, and return the mapped object"""
+        with self._lock:
+            mapped = self._refs.setdefault(id, obj)
+        self._touch(id, mapped)
+        return mapped
+
+    def __delitem__(self, id):
+        with self._lock:
+            del self._refs[id]
+            self._recent.pop(id, None)
+
+    def pop(self, id, default=None):
+        with self._lock:
+            self._recent.pop(id, None)
+            return self._refs.pop(id, default)
+
+    def __contains__(self, id):
+        return id in self._refs
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __iter__(self):
+        return iter(list(self._refs.keys()))
+
+    def keys(self):
+        return list(self._refs.keys())
+
+    def values(self):
+        return list(self._refs.values())
+
+    def items(self):
+        return list(self._refs.items())
+
+    def clear(self):
+        with self._lock:
+            self._refs.clear()
+            self._recent.clear()
+
+    def stats(self):
+        """Return a dictionary with the current size and the hit, miss and eviction counters"""
+        return {
+            "size": len(self),
+            "held": len(self._recent),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,230 @@
+import functools
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds, in seconds, of the latency histogram buckets
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Counter:
+    """A Prometheus counter, one value per tuple of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, label_values=(), amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        """Yield the (suffix, label values, extra labels, value) of every sample"""
+        for label_values, value in self.values.items():
+            yield "", label_values, (), value
+
+
+class Gauge(Counter):
+    """A Prometheus gauge whose values are read from collect() when the metrics are rendered"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), collect=None):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def samples(self):
+        if self.collect is not None:
+            self.values = dict(self.collect())
+        return super().samples()
+
+
+class Histogram:
+    """A Prometheus histogram with the same buckets for every tuple of label values"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (the last one is +Inf), sum]
+        self.values = {}
+
+    def observe(self, label_values, value):
+        entry = self.values.get(label_values)
+        if entry is None:
+            entry = self.values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self):
+        for label_values, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield "_bucket", label_values, (("le", str(bound)),), cumulative
+            yield "_sum", label_values, (), total
+            yield "_count", label_values, (), cumulative
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """ The metrics of the models, rendered in the Prometheus text format.
+    Nothing is recorded while enabled is False, the instrumented code only checks the flag."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def reset(self):
+        """Forget every recorded value"""
+        with self.lock:
+            for metric in self.metrics.values():
+                if not isinstance(metric, Gauge):
+                    metric.values = {}
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for metric in self.metrics.values():
+                lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.kind}")
+                for suffix, label_values, extra, value in list(metric.samples()):
+                    labels = ",".join(f'{name}="{escape(value)}"'
+                                      for name, value in (*zip(metric.labels, label_values), *extra))
+                    lines.append(f"{metric.name}{suffix}{{{labels}}} {value}" if labels else f"{metric.name}{suffix} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def identity_map_sizes():
+    """Yield the ((model,), number of mapped objects) of every model class"""
+    from models.base import Model
+    pending = list(Model.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if cls.table is not None:
+            yield (cls.__name__,), len(cls.all)
+
+
+REGISTRY = Registry(enabled=os.environ.get("HOTEL_METRICS", "") not in ("", "0"))
+
+OPERATION_SECONDS = REGISTRY.register(Histogram(
+    "hotel_orm_operation_seconds", "Duration of the model operations.", ("model", "operation")))
+OPERATION_ERRORS = REGISTRY.register(Counter(
+    "hotel_orm_operation_errors_total", "Model operations that raised an exception.", ("model", "operation")))
+ROWS_HYDRATED = REGISTRY.register(Counter(
+    "hotel_orm_rows_hydrated_total", "Rows turned into objects or records by the read operations.", ("model",)))
+IDENTITY_MAP_OBJECTS = REGISTRY.register(Gauge(
+    "hotel_orm_identity_map_objects", "Objects held by the identity map of each model.", ("model",),
+    identity_map_sizes))
+COMMIT_SECONDS = REGISTRY.register(Histogram(
+    "hotel_orm_commit_seconds", "Duration of the commits."))
+# Only the failures are counted, SQLite waits out a lock inside the statement and does not report the time spent
+LOCK_FAILURES = REGISTRY.register(Counter(
+    "hotel_orm_lock_failures_total",
+    "Operations that failed on a locked database once the busy timeout ran out. Waits that succeed are not counted.",
+    ("model", "operation")))
+
+
+def enable():
+    REGISTRY.enabled = True
+
+
+def disable():
+    REGISTRY.enabled = False
+
+
+def instrumented(operation, reads=False):
+    """ Decorate a model method to record its duration under operation, and with reads=True
+    the number of objects or records it returns. The model is the class of the first argument,
+    or the first argument itself for class methods. A disabled registry costs one flag check"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(first, *args, **kwargs):
+            if not REGISTRY.enabled:
+                return func(first, *args, **kwargs)
+
+            labels = (first.__name__ if isinstance(first, type) else type(first).__name__, operation)
+            start = time.perf_counter()
+            try:
+                result = func(first, *args, **kwargs)
+            except BaseException as error:
+                with REGISTRY.lock:
+                    OPERATION_ERRORS.inc(labels)
+                    if isinstance(error, sqlite3.OperationalError) and "locked" in str(error):
+                        LOCK_FAILURES.inc(labels)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                with REGISTRY.lock:
+                    OPERATION_SECONDS.observe(labels, elapsed)
+
+            if reads:
+                rows = len(result) if isinstance(result, list) else int(result is not None)
+                with REGISTRY.lock:
+                    ROWS_HYDRATED.inc(labels[:1], rows)
+            return result
+        return wrapper
+    return decorator
+
+
+def timed_commit(conn):
+    """Commit conn, recording the commit duration when the registry is enabled"""
+    if not REGISTRY.enabled:
+        conn.commit()
+        return
+    start = time.perf_counter()
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    with REGISTRY.lock:
+        COMMIT_SECONDS.observe((), elapsed)
+
+
+def write_metrics(path):
+    """Write the rendered metrics to path, replacing the file at once so a scraper never reads half of it"""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        file.write(REGISTRY.render())
+    os.replace(temporary, path)
+
+
+def serve_metrics(port=9464, host="127.0.0.1"):
+    """ Serve the rendered metrics at http://host:port/metrics from a daemon thread.
+    Return the server, call its shutdown() method to stop it"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,25 @@
+from collections import namedtuple
+
+
+class HotelRecord(namedtuple("HotelRecord", ["id", "name", "location"])):
+    """ Read-only hotel row returned by the records=True projection of the Hotel listings.
+    Records skip the property validation and the identity map, and print like a Hotel"""
+    __slots__ = ()
+
+    def __str__(self):
+        return f"<Hotel {self.id}: {self.name} @{self.location}>"
+
+
+class GuestRecord(namedtuple("GuestRecord", ["id", "name", "hotel_id", "hotel"], defaults=(None,))):
+    """ Read-only guest row returned by the records=True projection of the Guest listings.
+    hotel holds a HotelRecord when the guests were loaded with_hotel"""
+    __slots__ = ()
+
+    def __str__(self):
+        if self.hotel is not None:
+            return f"<Guest {self.id}: {self.name}> -- {self.hotel}"
+        # Records loaded without with_hotel only know the hotel id
+        if self.hotel_id is not None:
+            return f"<Guest {self.id}: {self.name}> -- <Hotel {self.hotel_id}>"
+        return f"<Guest {self.id}: {self.name}>"
+
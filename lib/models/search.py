@@ -0,0 +1,131 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from models.connection import get_connection
+from models.transaction import transaction
+
+
+_trigram_available = None
+
+# Fewer inserted rows are indexed by the insert trigger. Dropping and recreating the trigger is a schema
+# change, which empties the query caches and makes every connection prepare its statements again
+DEFER_MIN_ROWS = 100
+
+
+def trigram_available():
+    """Return True when the linked SQLite has FTS5 with the trigram tokenizer (SQLite 3.34+).
+    The probe runs on first use instead of at import time"""
+    global _trigram_available
+    if _trigram_available is None:
+        try:
+            sqlite3.connect(":memory:").execute(
+                "CREATE VIRTUAL TABLE probe USING fts5(text, tokenize='trigram')")
+            _trigram_available = True
+        except sqlite3.OperationalError:
+            _trigram_available = False
+    return _trigram_available
+
+# The trigram tokenizer can only match search terms of at least three characters
+MIN_MATCH_LENGTH = 3
+
+
+def create_search_index(table, columns, rebuild=False):
+    """ Create the <table>_fts full-text index over columns of table and the triggers
+    that keep it in sync with every insert, update and delete.
+    The index is rebuilt from the table when it is new or rebuild is True.
+    Return True when the index was (re)built, False when trigram search is unavailable"""
+    if not trigram_available():
+        return False
+
+    fts = f"{table}_fts"
+    column_list = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+
+    sql = """
+        SELECT name FROM sqlite_master
+        WHERE type = 'table' AND name = ?
+    """
+    conn = get_connection()
+    rebuild = rebuild or conn.execute(sql, (fts,)).fetchone() is None
+
+    conn.execute(f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts}
+        USING fts5({column_list}, content='{table}', content_rowid='id', tokenize='trigram')
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {column_list} ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {column_list}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts} (rowid, {column_list}) VALUES (new.id, {new_values});
+        END
+    """)
+    if rebuild:
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+    return True
+
+
+@contextmanager
+def deferred_search_index(table, columns, rows):
+    """ Index the rows inserted into table inside the block with one INSERT ... SELECT when it exits,
+    instead of one trigger insert per row. FTS5 writes its pending terms out at the end of every
+    statement, so an executemany indexed by the trigger writes one index segment per row.
+    The insert trigger is dropped for the duration of the block, inside a transaction, so other
+    connections never see the table without it. Rows inserted with an explicit id lower than the
+    current maximum must be added to the list yielded by the block.
+    rows is the number of rows the block inserts, below DEFER_MIN_ROWS the trigger indexes them."""
+    sql = """
+        SELECT sql FROM sqlite_master
+        WHERE type = 'trigger' AND name = ?
+    """
+    fts = f"{table}_fts"
+    with transaction():
+        conn = get_connection()
+        trigger = conn.execute(sql, (f"{fts}_insert",)).fetchone() if rows >= DEFER_MIN_ROWS else None
+        explicit_ids = []
+        if trigger is None:
+            yield explicit_ids
+            return
+
+        last_id = conn.execute(f"SELECT coalesce(max(id), 0) FROM {table}").fetchone()[0]
+        conn.execute(f"DROP TRIGGER {fts}_insert")
+        yield explicit_ids
+
+        column_list = ", ".join(columns)
+        conn.execute(f"""
+            INSERT INTO {fts} (rowid, {column_list})
+            SELECT id, {column_list} FROM {table}
+            WHERE id > ? OR id IN (SELECT value FROM json_each(?))
+        """, (last_id, json.dumps(explicit_ids)))
+        conn.execute(trigger[0])
+
+
+def drop_search_index(table):
+    """ Drop the <table>_fts full-text index, its triggers are dropped along with table """
+    get_connection().execute(f"DROP TABLE IF EXISTS {table}_fts")
+
+
+def uses_search_index(text):
+    """Return True when text can be looked up in the full-text index instead of scanning the table"""
+    return trigram_available() and len(text) >= MIN_MATCH_LENGTH
+
+
+def match_expression(text, columns=None):
+    """Return an FTS5 MATCH expression searching for text as a substring of columns (all by default)"""
+    phrase = '"' + text.replace('"', '""') + '"'
+    return f"{{{' '.join(columns)}}} : {phrase}" if columns else phrase
+
+
+def like_pattern(text):
+    """Return a LIKE pattern (with ESCAPE '\\') searching for text as a substring"""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
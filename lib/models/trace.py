@@ -0,0 +1,130 @@
+import math
+import re
+import sqlite3
+import time
+from collections import Counter, defaultdict
+from functools import partial
+from models.connection import configure, get_manager
+
+# Runs of one statement shape by a single command above which it is reported as a likely N+1 query
+REPEAT_THRESHOLD = 10
+
+# Number of repeated statement shapes listed by a report
+REPORTED_SHAPES = 5
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+
+def statement_shape(sql):
+    """Return sql with its literals replaced by ? and its whitespace collapsed, so repeated queries compare equal"""
+    return _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Cursor timing every execute and executemany call into the SqlTrace of its connection"""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.trace.calls.append((sql, time.perf_counter() - start))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.trace.calls.append((sql, time.perf_counter() - start))
+
+
+class TracedConnection(sqlite3.Connection):
+    """ Connection reporting to trace: every statement SQLite runs through the trace callback,
+    and the time of every execute call through TracedCursor """
+
+    def __init__(self, *args, trace, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.trace = trace
+        self.set_trace_callback(trace.statement)
+
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+class SqlTrace:
+    """ Statements run on the connections opened through connection_factory().
+    statements counts what SQLite runs, including each row of an executemany, the statements
+    of triggers and the commits. calls holds the (sql, seconds) of every execute call."""
+
+    def __init__(self, threshold=REPEAT_THRESHOLD):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        """Forget the statements traced so far"""
+        self.statements = 0
+        self.calls = []
+
+    def statement(self, sql):
+        """The sqlite3 trace callback"""
+        self.statements += 1
+
+    def connection_factory(self):
+        """Return the sqlite3.connect factory of connections reporting to this trace"""
+        return partial(TracedConnection, trace=self)
+
+    def report(self):
+        """ Return a dictionary with the statement and call counts, the total and 95th percentile call
+        latency in milliseconds, the (shape, count, milliseconds) of the shapes run more than once,
+        most frequent first, and the shapes run more than threshold times """
+        counts = Counter()
+        seconds = defaultdict(float)
+        for sql, elapsed in self.calls:
+            shape = statement_shape(sql)
+            counts[shape] += 1
+            seconds[shape] += elapsed
+
+        durations = sorted(elapsed for _, elapsed in self.calls)
+        p95 = durations[math.ceil(len(durations) * 0.95) - 1] if durations else 0.0
+        return {
+            "statements": self.statements,
+            "calls": len(durations),
+            "total_ms": sum(durations) * 1000,
+            "p95_ms": p95 * 1000,
+            "repeated": [(shape, count, seconds[shape] * 1000) for shape, count in counts.most_common() if count > 1],
+            "n_plus_one": [shape for shape, count in counts.items() if count > self.threshold],
+        }
+
+    def format_report(self, label=None):
+        """Return the report as display lines"""
+        report = self.report()
+        lines = [
+            f"SQL trace{f' for {label}' if label else ''}: {report['statements']} statements, "
+            f"{report['calls']} execute calls, {report['total_ms']:.2f} ms total, p95 {report['p95_ms']:.3f} ms"
+        ]
+        for shape, count, milliseconds in report["repeated"][:REPORTED_SHAPES]:
+            lines.append(f"  {count:>6}x {milliseconds:9.2f} ms  {shape}")
+        for shape in report["n_plus_one"]:
+            lines.append(f"WARNING: possible N+1 query, more than {self.threshold} runs of: {shape}")
+        return "\n".join(lines)
+
+
+def start_tracing(threshold=REPEAT_THRESHOLD):
+    """Reopen the model connections as traced connections and return the SqlTrace they report to"""
+    trace = SqlTrace(threshold)
+    manager = get_manager()
+    configure(manager.path, manager.pragmas, trace.connection_factory())
+    return trace
+
+
+def stop_tracing():
+    """Reopen the model connections without tracing"""
+    manager = get_manager()
+    configure(manager.path, manager.pragmas)
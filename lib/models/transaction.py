@@ -0,0 +1,99 @@
+import threading
+from contextlib import contextmanager
+from models.connection import get_connection
+from models.metrics import timed_commit
+
+_local = threading.local()
+
+
+def _scopes():
+    """ Return the rollback callback lists of the transaction and savepoints open
+    on the calling thread's connection, innermost last"""
+    scopes = getattr(_local, "scopes", None)
+    if scopes is None:
+        scopes = _local.scopes = []
+    return scopes
+
+
+@contextmanager
+def transaction():
+    """ Group every model write inside the block into a single commit.
+    The outermost block commits on success and rolls back on an exception.
+    Nested blocks run inside a SAVEPOINT so they can roll back on their own
+    without undoing the work of the enclosing block.
+    Transactions belong to the calling thread and its connection."""
+    conn = get_connection()
+    scopes = _scopes()
+    depth = len(scopes)
+    savepoint = f"sp_{depth}"
+    if depth:
+        conn.execute(f"SAVEPOINT {savepoint}")
+    elif not conn.in_transaction:
+        conn.execute("BEGIN")
+    scopes.append([])
+
+    try:
+        yield
+        if depth:
+            conn.execute(f"RELEASE {savepoint}")
+        else:
+            timed_commit(conn)
+    except BaseException:
+        if depth:
+            conn.execute(f"ROLLBACK TO {savepoint}")
+            conn.execute(f"RELEASE {savepoint}")
+        else:
+            conn.rollback()
+        for undo in reversed(scopes.pop()):
+            undo()
+        raise
+    else:
+        undos = scopes.pop()
+        if depth:
+            # The parent can still roll back the work of a released savepoint
+            scopes[-1].extend(undos)
+
+
+def in_transaction():
+    """Return True when called inside a transaction() block"""
+    return bool(_scopes())
+
+
+def commit():
+    """ Commit the current statement unless a transaction() block is open,
+    in which case the block commits once when it exits"""
+    if not _scopes():
+        timed_commit(get_connection())
+
+
+def on_rollback(undo):
+    """Register a callable that reverts in-memory state if the open transaction rolls back"""
+    scopes = _scopes()
+    if scopes:
+        scopes[-1].append(undo)
+
+
+def forget_on_rollback(obj):
+    """Remove a newly saved object from its identity map and clear its id if the insert is rolled back"""
+    if not _scopes():
+        return
+    id = obj.id
+
+    def undo():
+        type(obj).all.pop(id, None)
+        obj.id = None
+
+    on_rollback(undo)
+
+
+def restore_on_rollback(obj):
+    """Restore the current id and attribute values of an object if the following write is rolled back"""
+    if not _scopes():
+        return
+    state = dict(vars(obj))
+
+    def undo():
+        vars(obj).update(state)
+        type(obj).all[obj.id] = obj
+
+    on_rollback(undo)
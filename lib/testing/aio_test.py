@@ -0,0 +1,78 @@
+from models.aio import DB_WORKERS, run_in_db_thread
+from models.guest import Guest
+from models.hotel import Hotel
+import asyncio
+import threading
+import pytest
+
+
+class TestAsyncModels:
+    '''Async model methods in aio.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Guest.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Guest.create_table()
+        Hotel.all.clear()
+        Guest.all.clear()
+
+    def test_runs_on_db_thread(self):
+        '''runs the blocking calls on a database thread instead of the event loop thread.'''
+
+        async def main():
+            return await run_in_db_thread(threading.current_thread)
+
+        assert (asyncio.run(main()) is not threading.current_thread())
+
+    def test_keeps_identity(self):
+        '''returns the objects of the shared identity map from "afind_by_id()" and "aget_all()".'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+
+        async def main():
+            return await asyncio.gather(Hotel.afind_by_id(hotel.id), Hotel.aget_all())
+
+        found, hotels = asyncio.run(main())
+        assert (found is hotel)
+        assert (hotels == [hotel])
+
+    def test_creates_and_iterates(self):
+        '''creates rows with "acreate_many()" and streams them back with "aiter_all()".'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+
+        async def main():
+            created = await Guest.acreate_many([("Raha", hotel.id), ("Tal", hotel.id), ("Amir", hotel.id)])
+            streamed = [guest async for guest in Guest.aiter_all(batch_size=2, with_hotel=True)]
+            return created, streamed
+
+        created, streamed = asyncio.run(main())
+        assert (streamed == created)
+        assert (streamed[0].hotel is hotel)
+
+    def test_stops_early(self):
+        '''releases the database thread when the consumer stops iterating early.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_many((f"Guest {i}", hotel.id) for i in range(50))
+
+        async def main():
+            guests = Guest.aiter_all(batch_size=1)
+            first = [await guests.__anext__() for _ in range(2)]
+            await guests.aclose()
+            return first
+
+        assert ([guest.name for guest in asyncio.run(main())] == ["Guest 0", "Guest 1"])
+
+    def test_iterators_leave_the_db_threads_free(self):
+        '''runs more iterators than database threads while their consumers await other async calls.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_many((f"Guest {i}", hotel.id) for i in range(5))
+
+        async def consume():
+            return [await Guest.afind_by_id(guest.id) async for guest in Guest.aiter_all(batch_size=1)]
+
+        async def main():
+            return await asyncio.wait_for(asyncio.gather(*(consume() for _ in range(DB_WORKERS + 1))), timeout=10)
+
+        assert (all(len(guests) == 5 for guests in asyncio.run(main())))
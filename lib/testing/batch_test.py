@@ -0,0 +1,50 @@
+from batch import run_batch, BatchError
+from models.__init__ import CURSOR
+from models.guest import Guest
+from models.hotel import Hotel
+import json
+import pytest
+
+
+class TestBatch:
+    '''Function run_batch() in batch.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Guest.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Guest.create_table()
+        Hotel.all.clear()
+        Guest.all.clear()
+
+    def test_runs_operations(self):
+        '''runs every operation of the stream and returns a summary of the operations run.'''
+        lines = [
+            json.dumps({"op": "create_hotel", "name": "Sonder", "location": "545 Utica Avenue"}),
+            "",
+            json.dumps({"op": "create_guest", "name": "Raha", "hotel_id": 1}),
+            json.dumps({"op": "update_guest", "id": 1, "name": "Raha Moharrak"}),
+            json.dumps({"op": "search_guests", "text": "moharrak"}),
+        ]
+        echoed = []
+
+        summary = run_batch(lines, echo=echoed.append)
+        assert (summary["operations"] == 4)
+        assert (summary["counts"]["create_guest"] == 1)
+        assert (echoed == ["<Guest 1: Raha Moharrak> -- <Hotel 1: Sonder @545 Utica Avenue>"])
+
+    def test_rolls_back_on_error(self):
+        '''rolls back the whole batch and reports the failing line.'''
+        lines = [
+            json.dumps({"op": "create_hotel", "name": "Sonder", "location": "545 Utica Avenue"}),
+            json.dumps({"op": "create_guest", "name": "Raha", "hotel_id": 7000}),
+        ]
+
+        with pytest.raises(BatchError) as error:
+            run_batch(lines)
+        assert (error.value.line_number == 2)
+        assert (CURSOR.execute("SELECT * FROM hotels").fetchall() == [])
+        with pytest.raises(BatchError):
+            run_batch(['{"op": "drop_everything"}'])
@@ -0,0 +1,123 @@
+from models.__init__ import CONN
+from models.cache import VERSIONS_SQL, QueryCache, get_cache
+from models.connection import get_manager
+from models.guest import Guest
+from models.hotel import Hotel
+from models.transaction import transaction
+import pytest
+import sqlite3
+import threading
+
+
+class TestQueryCache:
+    '''Query result cache in cache.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Guest.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Guest.create_table()
+        Hotel.all.clear()
+        Guest.all.clear()
+        # Take in the schema changes of the fixture, which empty the cache on the first hit otherwise
+        get_cache().is_current()
+
+    def statements(self, func):
+        '''return the statements run by func, without the statements run inside the pragma functions.'''
+        statements = []
+        CONN.set_trace_callback(statements.append)
+        try:
+            func()
+        finally:
+            CONN.set_trace_callback(None)
+        return [statement for statement in statements if not statement.startswith("--")]
+
+    def test_repeated_reads_skip_the_query(self):
+        '''returns repeated finder results from the cache, only checking the database versions.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Hotel.get_all()
+        Hotel.find_by_id(hotel.id)
+
+        assert (self.statements(lambda: (Hotel.get_all(), Hotel.find_by_id(hotel.id))) == [VERSIONS_SQL] * 2)
+        assert (Hotel.get_all() == [hotel])
+
+    def test_model_writes_invalidate_their_table(self):
+        '''makes the results of a table stale when a model writes to it, and only that table.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        guest = Guest.create("Raha", hotel.id)
+        assert (Guest.get_all() == [guest])
+        Hotel.get_all()
+
+        other = Guest.create("Tal", hotel.id)
+        assert (Guest.get_all() == [guest, other])
+        assert (self.statements(Hotel.get_all) == [VERSIONS_SQL])
+        Guest.reassign_hotel(hotel.id, Hotel.create("Moxy", "Soho").id)
+        assert ({guest.hotel_id for guest in Guest.get_all(with_hotel=True)} == {2})
+        hotel.delete()
+        assert (Hotel.find_by_id(hotel.id) is None)
+
+    def test_outside_writes_invalidate(self):
+        '''empties the cache after raw SQL on the connection or a commit from another connection.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        assert (Hotel.find_by_name("Sonder") is hotel)
+        assert (Hotel.find_by_id(hotel.id).name == "Sonder")
+
+        CONN.execute("UPDATE hotels SET name = 'Moxy'")
+        CONN.commit()
+        assert (Hotel.find_by_name("Sonder") is None)
+
+        other = sqlite3.connect(get_manager().path)
+        other.execute("UPDATE hotels SET name = 'Sonder'")
+        other.commit()
+        other.close()
+        assert (Hotel.find_by_name("Sonder") is hotel)
+
+        Hotel.find_by_id(hotel.id)
+        other = sqlite3.connect(get_manager().path)
+        other.execute("UPDATE hotels SET name = 'Moxy'")
+        other.commit()
+        other.close()
+        assert (Hotel.find_by_id(hotel.id).name == "Moxy")
+
+    def test_schema_changes_invalidate(self):
+        '''empties the cache after raw DDL, which changes no rows.'''
+        Hotel.create("Sonder", "545 Utica Avenue")
+        assert (len(Hotel.get_all()) == 1)
+
+        CONN.execute("DROP TABLE hotels")
+        CONN.execute(Hotel.sql["create_table"])
+        CONN.commit()
+        assert (Hotel.get_all() == [])
+
+    def test_other_threads_writes_invalidate(self):
+        '''makes the results stale in every thread when a model writes in one of them.'''
+        Hotel.create("Sonder", "545 Utica Avenue")
+        assert (len(Hotel.get_all()) == 1)
+
+        thread = threading.Thread(target=Hotel.create, args=("Moxy", "Soho"))
+        thread.start()
+        thread.join()
+        assert (len(Hotel.get_all()) == 2)
+
+    def test_transactions_bypass_the_cache(self):
+        '''reads uncommitted rows inside a transaction and keeps the cache valid after a rollback.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Hotel.get_all()
+        with pytest.raises(ValueError):
+            with transaction():
+                other = Hotel.create("Moxy", "Soho")
+                assert (Hotel.get_all() == [hotel, other])
+                raise ValueError("roll back")
+        assert (Hotel.get_all() == [hotel])
+
+    def test_evicts_least_recently_used(self):
+        '''keeps at most maxsize results, evicting the least recently used one.'''
+        cache = QueryCache(CONN, maxsize=2)
+        for id in (1, 2, 1, 3):
+            cache.fetch("SELECT ?", (id,), ())
+
+        assert ([key[1] for key in cache.entries] == [(1,), (3,)])
+        assert (cache.hits == 1)
+        assert (get_cache().conn is CONN)
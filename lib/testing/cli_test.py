@@ -0,0 +1,61 @@
+from click.testing import CliRunner
+from models.guest import Guest
+from models.hotel import Hotel
+import cli
+import pytest
+
+
+class TestDeleteHotel:
+    '''Command delete-hotel in cli.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Guest.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Guest.create_table()
+        Hotel.all.clear()
+        Guest.all.clear()
+
+    def delete_hotel(self, *args):
+        '''run delete-hotel with args and return its result.'''
+        # Without HOTEL_DB_PATH the --db option keeps the open connections of the tests
+        return CliRunner(env={"HOTEL_DB_PATH": None}).invoke(cli.cli, ["delete-hotel", *args])
+
+    def test_deletes_hotel_without_guests(self):
+        '''deletes a hotel that has no guests.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+
+        result = self.delete_hotel("--id", hotel.id)
+        assert (result.exit_code == 0)
+        assert (Hotel.find_by_id(hotel.id) is None)
+
+    def test_cascade(self):
+        '''deletes the guests of the hotel with --cascade.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_many([("Raha", hotel.id), ("Tal", hotel.id)])
+
+        result = self.delete_hotel("--id", hotel.id, "--cascade")
+        assert (result.exit_code == 0)
+        assert ((Hotel.find_by_id(hotel.id), Guest.get_all()) == (None, []))
+
+    def test_restrict(self):
+        '''leaves a hotel that still has guests in place with --restrict.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create("Raha", hotel.id)
+
+        result = self.delete_hotel("--id", hotel.id, "--restrict")
+        assert (result.exit_code == 0)
+        assert ("nothing was deleted" in result.output)
+        assert (Hotel.find_by_id(hotel.id) is hotel)
+
+    def test_keeps_guests_without_a_terminal(self):
+        '''deletes the hotel and keeps its guests without asking when no one is at the terminal.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        guest = Guest.create("Raha", hotel.id)
+
+        result = self.delete_hotel("--id", hotel.id)
+        assert (result.exit_code == 0)
+        assert (Hotel.find_by_id(hotel.id) is None)
+        assert (Guest.get_all() == [guest])
@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
 
+import os
+import tempfile
+
+# Run the tests against a scratch database, the pragmas (WAL mode among them) persist in the file
+os.environ["HOTEL_DB_PATH"] = os.path.join(tempfile.mkdtemp(), "hotel.db")
+
+
 def pytest_itemcollected(item):
     par = item.parent.obj
     node = item.obj
@@ -0,0 +1,48 @@
+from models.connection import ConnectionManager
+import sqlite3
+import threading
+import pytest
+
+
+class TestConnectionManager:
+    '''Class ConnectionManager in connection.py'''
+
+    @pytest.fixture
+    def manager(self, tmp_path):
+        '''open a connection manager on a temporary database.'''
+        manager = ConnectionManager(str(tmp_path / "hotel.db"))
+        yield manager
+        manager.close_all()
+
+    def test_path_from_environment(self, monkeypatch, tmp_path):
+        '''reads the database path from HOTEL_DB_PATH when no path is given.'''
+        monkeypatch.setenv("HOTEL_DB_PATH", str(tmp_path / "env.db"))
+        assert (ConnectionManager().path == str(tmp_path / "env.db"))
+
+    def test_applies_pragmas(self, manager):
+        '''applies the performance pragma profile to new connections.'''
+        conn = manager.connection()
+        assert (conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal")
+        assert (conn.execute("PRAGMA synchronous").fetchone()[0] == 1)
+        assert (conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000)
+
+    def test_connection_per_thread(self, manager):
+        '''returns the same connection within a thread and a separate one for every other thread.'''
+        others = []
+        thread = threading.Thread(target=lambda: others.append(manager.connection()))
+        thread.start()
+        thread.join()
+
+        assert (manager.connection() is manager.connection())
+        assert (others[0] is not manager.connection())
+
+    def test_closes_connection_of_ended_thread(self, manager):
+        '''closes the connection of a thread once the thread ends.'''
+        others = []
+        thread = threading.Thread(target=lambda: others.append(manager.connection()))
+        thread.start()
+        thread.join()
+
+        assert (len(manager._connections) == 0)
+        with pytest.raises(sqlite3.ProgrammingError):
+            others[0].execute("SELECT 1")
@@ -15,8 +15,8 @@ class TestGuest:
         CURSOR.execute("DROP TABLE IF EXISTS guests")
         CURSOR.execute("DROP TABLE IF EXISTS hotels")
 
-        Hotel.all = {}
-        Guest.all = {}
+        Hotel.all.clear()
+        Guest.all.clear()
 
     def test_creates_table(self):
         '''contains method "create_table()" that creates table "guests" if it does not exist.'''
@@ -256,4 +256,239 @@ class TestGuest:
         )
 
         guest = Guest.find_by_id(3)
-        assert (guest is None)
\ No newline at end of file
+        assert (guest is None)
+
+    def test_creates_many(self):
+        '''contains method "create_many()" that inserts a Guest row per tuple or dict and returns the saved Guest instances.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+
+        guests = Guest.create_many([("Raha", hotel.id), {"name": "Tal", "hotel_id": hotel.id}])
+
+        rows = CURSOR.execute("SELECT * FROM guests").fetchall()
+        assert (rows == [(guests[0].id, "Raha", hotel.id), (guests[1].id, "Tal", hotel.id)])
+        assert (Guest.all[guests[0].id] is guests[0])
+
+        with pytest.raises(ValueError):
+            Guest.create_many([("Amir", hotel.id), ("Kai", 7000)])
+        assert (len(CURSOR.execute("SELECT * FROM guests").fetchall()) == 2)
+
+    def test_instance_from_db_trusts_row(self):
+        '''contains method "instance_from_db()" that hydrates a row without querying the hotels table.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+        Guest.create_many([("Raha", hotel.id), ("Tal", hotel.id)])
+        Guest.all.clear()
+
+        statements = []
+        CONN.set_trace_callback(statements.append)
+        try:
+            guests = Guest.get_all()
+        finally:
+            CONN.set_trace_callback(None)
+
+        assert ([(guest.name, guest.hotel_id) for guest in guests] ==
+                [("Raha", hotel.id), ("Tal", hotel.id)])
+        assert (len(statements) == 1)
+
+    def test_gets_all_with_hotel(self):
+        '''contains method "get_all(with_hotel=True)" that loads the guests and their hotels with a single JOIN query.'''
+
+        Hotel.create_table()
+        hotel1 = Hotel.create("Sonder", "545 Utica Avenue")
+        hotel2 = Hotel.create("The Moxy Hotel", "Soho")
+        Guest.create_table()
+        Guest.create_many([("Raha", hotel1.id), ("Tal", hotel2.id)])
+        Hotel.all.clear()
+        Guest.all.clear()
+
+        statements = []
+        CONN.set_trace_callback(statements.append)
+        try:
+            rendered = [str(guest) for guest in Guest.get_all(with_hotel=True)]
+        finally:
+            CONN.set_trace_callback(None)
+
+        assert (rendered == [
+            f"<Guest 1: Raha> -- <Hotel {hotel1.id}: Sonder @545 Utica Avenue>",
+            f"<Guest 2: Tal> -- <Hotel {hotel2.id}: The Moxy Hotel @Soho>"])
+        assert (len(statements) == 1)
+
+    def test_iters_all(self):
+        '''contains method "iter_all()" that lazily yields a Guest instance per row, fetching the rows in batches.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+        guests = Guest.create_many([("Raha", hotel.id), ("Tal", hotel.id), ("Amir", hotel.id)])
+
+        assert (list(Guest.iter_all(batch_size=2)) == guests)
+        assert (list(Guest.iter_by_name_length(3, batch_size=2, with_hotel=True)) == [guests[1]])
+        assert (list(hotel.iter_guests(batch_size=2)) == guests)
+
+    def test_creates_indexes(self):
+        '''contains method "create_indexes()" that adds the declared indexes missing from the "guests" table.'''
+
+        Hotel.create_table()
+        Guest.create_table()
+        CURSOR.execute("DROP INDEX guests_name_idx")
+
+        assert (Guest.create_indexes() == ["guests_name_idx"])
+        assert (Guest.create_indexes() == [])
+
+        plan = CURSOR.execute("EXPLAIN QUERY PLAN SELECT * FROM guests WHERE hotel_id = ?", (1,)).fetchall()
+        assert ("guests_hotel_id_idx" in plan[0][3])
+
+    def test_finds_by_name_length(self):
+        '''contains methods "find_by_name_length()" and "count_by_name_length()" that filter guests by name length in SQL.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+        raha, tal, amir, tristan = Guest.create_many(
+            [("Raha", hotel.id), ("Tal", hotel.id), ("Amir", hotel.id), ("Tristan", hotel.id)])
+
+        assert (Guest.find_by_name_length(4) == [raha, tal, amir])
+        assert (Guest.find_by_name_length_between(4, 7) == [raha, amir, tristan])
+        assert (Guest.count_by_name_length(3) == 1)
+        assert (Guest.count_by_name_length_between(5, 10) == 1)
+
+        plan = CURSOR.execute("EXPLAIN QUERY PLAN SELECT count(*) FROM guests WHERE length(name) BETWEEN ? AND ?",
+                              (0, 4)).fetchall()
+        assert ("guests_name_length_idx" in plan[0][3])
+
+    def test_searches(self):
+        '''contains method "search()" that finds guests whose name contains the search text.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+        raha, tal, tristan = Guest.create_many([("Raha", hotel.id), ("Tal", hotel.id), ("Tristan", hotel.id)])
+
+        assert (Guest.search("tal") == [tal])
+        assert (Guest.search("t", limit=5) == [tal, tristan])
+        assert (Guest.search("rah", with_hotel=True)[0].hotel is hotel)
+
+        raha.delete()
+        assert (Guest.search("rah") == [])
+
+    def test_pages(self):
+        '''contains method "page()" that returns the guests after or before an id, in id order.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+        guests = Guest.create_many((f"Guest {i}", hotel.id) for i in range(5))
+
+        assert (Guest.page(after_id=guests[0].id, limit=3) == guests[1:4])
+        assert (Guest.page(before_id=guests[2].id, limit=3, with_hotel=True) == guests[:2])
+        assert (Guest.page(limit=1)[0].hotel is hotel)
+
+    def test_returns_records(self):
+        '''returns read-only GuestRecord tuples, with their HotelRecord when with_hotel, when called with records=True.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+        guest = Guest.create("Raha", hotel.id)
+        Hotel.all.clear()
+        Guest.all.clear()
+
+        records = Guest.get_all(with_hotel=True, records=True)
+        assert (records[0][:3] == (guest.id, "Raha", hotel.id))
+        assert (records[0].hotel == (hotel.id, "Sonder", "545 Utica Avenue"))
+        assert (str(records[0]) == str(guest))
+        assert (Guest.get_all(records=True)[0].hotel is None)
+        assert (str(Guest.get_all(records=True)[0]) == f"<Guest {guest.id}: Raha> -- <Hotel {hotel.id}>")
+        assert (list(Guest.iter_all(with_hotel=True, records=True)) == records)
+        assert (Guest.page(with_hotel=True, records=True) == records)
+        assert (Guest.search("raha", with_hotel=True, records=True) == records)
+        assert (Guest.find_by_name_length(4, with_hotel=True, records=True) == records)
+        assert (len(Hotel.all) == 0 and len(Guest.all) == 0)
+
+    def test_hotel_delete_modes(self):
+        '''keeps the guests of a hotel deleted by "Hotel.delete()", deletes them with one statement when it cascades, or refuses to delete the hotel.'''
+
+        Hotel.create_table()
+        sonder, jackal = Hotel.create_many([("Sonder", "545 Utica Avenue"), ("Jackal", "Jackal Lane")])
+        Guest.create_table()
+        raha, tal, amir = Guest.create_many([("Raha", sonder.id), ("Tal", sonder.id), ("Amir", jackal.id)])
+        raha_id = raha.id
+
+        with pytest.raises(ValueError):
+            sonder.delete("restrict")
+        assert (Hotel.find_by_id(sonder.id) is sonder)
+
+        sonder.delete("cascade")
+        assert (raha.id is None and tal.id is None)
+        assert (raha_id not in Guest.all)
+        assert (Guest.get_all() == [amir])
+
+        jackal.delete("set_null")
+        assert (amir.hotel_id is None)
+        assert (CURSOR.execute("SELECT hotel_id FROM guests WHERE id = ?", (amir.id,)).fetchone() == (None,))
+
+        moxy = Hotel.create("Moxy", "Soho")
+        roni = Guest.create("Roni", moxy.id)
+        moxy_id = moxy.id
+        moxy.delete()
+        assert (Guest.find_by_id(roni.id) is roni and roni.hotel_id == moxy_id)
+
+    def test_bulk_updates(self):
+        '''contains methods "bulk_update()" and "reassign_hotel()" that update many rows with one statement and keep loaded guests in sync.'''
+
+        Hotel.create_table()
+        sonder, jackal = Hotel.create_many([("Sonder", "545 Utica Avenue"), ("Jackal", "Jackal Lane")])
+        Guest.create_table()
+        raha, tal, amir = Guest.create_many([("Raha", sonder.id), ("Tal", sonder.id), ("Amir", jackal.id)])
+
+        assert (Guest.reassign_hotel(sonder.id, jackal.id) == 2)
+        assert ((raha.hotel_id, tal.hotel_id) == (jackal.id, jackal.id))
+        assert (raha.hotel is jackal)
+        assert (sonder.guests() == [])
+
+        assert (Guest.bulk_update(where={"name": "Amir"}, values={"name": "Amira"}) == 1)
+        Guest.all.clear()
+        assert (Guest.find_by_id(amir.id).name == "Amira")
+        with pytest.raises(ValueError):
+            Guest.reassign_hotel(jackal.id, 7000)
+        with pytest.raises(ValueError):
+            Guest.bulk_update(where={"room": 1}, values={"name": "Tal"})
+
+    def test_upserts(self):
+        '''contains method "upsert_many()" that inserts new rows and updates existing ones with INSERT ... ON CONFLICT.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create_table()
+        raha = Guest.create("Raha", hotel.id)
+
+        raha2, tal, amir = Guest.upsert_many([(raha.id, "Raha Moharrak", hotel.id), (50, "Tal", hotel.id),
+                                              {"name": "Amir", "hotel_id": hotel.id}])
+        assert (raha2 is raha and raha.name == "Raha Moharrak")
+        assert ((tal.id, Guest.find_by_id(50)) == (50, tal))
+        assert (amir.id == 51)
+        assert (len(Guest.get_all()) == 3)
+        with pytest.raises(ValueError):
+            Guest.upsert_many([(raha.id, "Raha", 7000)])
+        assert (raha.hotel_id == hotel.id)
+
+    def test_occupancy(self):
+        '''counts the guests of every hotel in SQL with "Hotel.guest_counts()", "most_occupied()" and "without_guests()".'''
+
+        Hotel.create_table()
+        sonder, jackal, moxy = Hotel.create_many(
+            [("Sonder", "545 Utica Avenue"), ("Jackal", "Jackal Lane"), ("The Moxy Hotel", "Soho")])
+        Guest.create_table()
+        Guest.create_many([("Raha", jackal.id), ("Tal", jackal.id), ("Amir", sonder.id)])
+        Guest.all.clear()
+
+        assert (Hotel.guest_counts() == [(sonder, 1), (jackal, 2), (moxy, 0)])
+        assert (Hotel.most_occupied(1) == [(jackal, 2)])
+        assert (Hotel.without_guests(records=True) == [(moxy.id, "The Moxy Hotel", "Soho")])
+        assert (Hotel.occupancy() == {"hotels": 3, "guests": 3, "hotels_without_guests": 1})
+        assert (len(Guest.all) == 0)
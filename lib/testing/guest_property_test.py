@@ -14,8 +14,8 @@ class TestGuestProperties:
         Guest.create_table()
         Hotel.create_table()
         # clear the object cache
-        Hotel.all = {}
-        Guest.all = {}
+        Hotel.all.clear()
+        Guest.all.clear()
 
     def test_name_hotel_valid(self):
         '''validates name and hotel id are valid'''
@@ -12,7 +12,7 @@ class TestHotel:
 
         CURSOR.execute("DROP TABLE IF EXISTS guests")
         CURSOR.execute("DROP TABLE IF EXISTS hotels")
-        Hotel.all = {}
+        Hotel.all.clear()
 
     def test_creates_table(self):
         '''contains method "create_table()" that creates table "hotels" if it does not exist.'''
@@ -209,7 +209,7 @@ class TestHotel:
         '''contain a method "guests" that gets the guests for the current Hotel instance '''
 
         from models.guest import Guest  # avoid circular import issue
-        Guest.all = {}
+        Guest.all.clear()
 
         Hotel.create_table()
         hotel1 = Hotel.create("Sonder", "828 Brittle Road")
@@ -226,4 +226,106 @@ class TestHotel:
         assert ((guests[0].id, guests[0].name, guests[0].hotel_id) ==
                 (guest1.id, guest1.name, guest1.hotel_id))
         assert ((guests[1].id, guests[1].name, guests[1].hotel_id) ==
-                (guest2.id, guest2.name, guest2.hotel_id))
\ No newline at end of file
+                (guest2.id, guest2.name, guest2.hotel_id))
+
+    def test_creates_many(self):
+        '''contains method "create_many()" that inserts a Hotel row per tuple or dict and returns the saved Hotel instances.'''
+
+        Hotel.create_table()
+        Hotel.create("Sonder", "828 Brittle Road")
+
+        hotels = Hotel.create_many([
+            ("Jackal", "Jackal Lane"),
+            {"name": "Marketing", "location": "Building B, 3rd Floor"}])
+
+        rows = CURSOR.execute("SELECT * FROM hotels WHERE id > 1").fetchall()
+        assert (rows == [(hotels[0].id, "Jackal", "Jackal Lane"),
+                         (hotels[1].id, "Marketing", "Building B, 3rd Floor")])
+        assert (Hotel.all[hotels[1].id] is hotels[1])
+        assert (Hotel.create_many([]) == [])
+
+    def test_iters_all(self):
+        '''contains method "iter_all()" that lazily yields a Hotel instance per row, fetching the rows in batches.'''
+
+        Hotel.create_table()
+        hotel1 = Hotel.create("Jackal", "Jackal Lane")
+        hotel2 = Hotel.create("Marketing", "Building B, 3rd Floor")
+
+        hotels = Hotel.iter_all(batch_size=1)
+        assert (next(hotels) is hotel1)
+        # other queries do not disturb the cursor of the running iteration
+        assert (Hotel.find_by_id(hotel1.id) is hotel1)
+        assert (list(hotels) == [hotel2])
+
+    def test_creates_indexes(self):
+        '''contains method "create_table()" that also creates the indexes declared in "indexes".'''
+
+        assert (Hotel.create_indexes() == [])
+        Hotel.create_table()
+
+        plan = CURSOR.execute("EXPLAIN QUERY PLAN SELECT * FROM hotels WHERE name is ?", ("Sonder",)).fetchall()
+        assert ("hotels_name_idx" in plan[0][3])
+        assert (Hotel.create_indexes() == [])
+
+    def test_searches(self):
+        '''contains method "search()" that finds hotels whose name or location contains the search text.'''
+
+        Hotel.create_table()
+        sonder, jackal, moxy = Hotel.create_many(
+            [("Sonder", "545 Utica Avenue"), ("Jackal", "Jackal Lane"), ("The Moxy Hotel", "Soho")])
+
+        assert (Hotel.search("jack") == [jackal])
+        assert (Hotel.search("so") == [sonder, moxy])
+        assert (Hotel.search("so", columns=("name",)) == [sonder])
+        assert (Hotel.search("%") == [])
+
+        # the search index follows updates and deletes
+        jackal.update("Sonder West", "Jackal Lane")
+        moxy.delete()
+        assert (sorted(Hotel.search("sonder"), key=lambda hotel: hotel.id) == [sonder, jackal])
+        assert (Hotel.search("moxy") == [])
+
+    def test_pages(self):
+        '''contains method "page()" that returns the hotels after or before an id, in id order.'''
+
+        Hotel.create_table()
+        hotels = Hotel.create_many((f"Hotel {i}", f"{i} Main Street") for i in range(5))
+
+        assert (Hotel.page(limit=2) == hotels[:2])
+        assert (Hotel.page(after_id=hotels[1].id, limit=2) == hotels[2:4])
+        assert (Hotel.page(before_id=hotels[4].id, limit=2) == hotels[2:4])
+        assert (Hotel.page(after_id=hotels[4].id) == [])
+
+    def test_returns_records(self):
+        '''returns read-only HotelRecord tuples that print like hotels when called with records=True.'''
+
+        Hotel.create_table()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Hotel.all.clear()
+
+        records = Hotel.get_all(records=True)
+        assert (records == [(hotel.id, "Sonder", "545 Utica Avenue")])
+        assert (str(records[0]) == str(hotel))
+        assert (list(Hotel.iter_all(records=True)) == records)
+        assert (Hotel.page(records=True) == records)
+        assert (Hotel.search("sonder", records=True) == records)
+        assert (len(Hotel.all) == 0)
+        with pytest.raises(AttributeError):
+            records[0].name = "Jackal"
+
+    def test_upserts_and_bulk_updates(self):
+        '''contains methods "upsert_many()" and "bulk_update()" that write many rows in one statement.'''
+
+        Hotel.create_table()
+        sonder = Hotel.create("Sonder", "545 Utica Avenue")
+
+        hotels = Hotel.upsert_many([(sonder.id, "Sonder", "Utica Avenue"), (None, "Jackal", "Jackal Lane")])
+        assert (hotels[0] is sonder and sonder.location == "Utica Avenue")
+        with pytest.raises(ValueError):
+            Hotel.bulk_update(where={}, values={"location": "Brooklyn"})
+        assert (Hotel.bulk_update(where={}, values={"location": "Brooklyn"}, all=True) == 2)
+        assert ([hotel.location for hotel in Hotel.get_all()] == ["Brooklyn", "Brooklyn"])
+        with pytest.raises(ValueError):
+            Hotel.bulk_update(where={"id": sonder.id}, values={"name": ""})
+        with pytest.raises(ValueError):
+            Hotel.bulk_update(where={"city": "Brooklyn"}, values={"name": "Jackal"})
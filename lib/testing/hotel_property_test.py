@@ -9,7 +9,7 @@ class TestHotelProperties:
     @pytest.fixture(autouse=True)
     def clear_dictionary(self):
         '''clear out the class dictionary.'''
-        Hotel.all = {}
+        Hotel.all.clear()
 
     def test_name_location_valid(self):
         '''validates name and location assigned valid non-empty strings'''
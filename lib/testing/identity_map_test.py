@@ -0,0 +1,56 @@
+from models.identity_map import IdentityMap
+from models.hotel import Hotel
+import gc
+import pytest
+
+
+class TestIdentityMap:
+    '''Class IdentityMap in identity_map.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate the hotels table and install a small identity map prior to each test.'''
+        Hotel.drop_table()
+        Hotel.create_table()
+        mapped, Hotel.all = Hotel.all, IdentityMap(maxsize=2)
+        yield
+        Hotel.all = mapped
+
+    def test_same_object_while_in_use(self):
+        '''returns the same object for a row while it is referenced, even after it was evicted.'''
+
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Hotel.create_many([("Jackal", "Jackal Lane"), ("Marketing", "Building B")])
+
+        assert (Hotel.all.evictions == 1)
+        assert (Hotel.find_by_id(hotel.id) is hotel)
+
+    def test_frees_evicted_objects(self):
+        '''frees evicted objects that are no longer referenced.'''
+
+        Hotel.create_many([("Sonder", "545 Utica Avenue"), ("Jackal", "Jackal Lane"),
+                           ("Marketing", "Building B")])
+        gc.collect()
+
+        assert (len(Hotel.all) == 2)
+        assert (1 not in Hotel.all)
+
+    def test_counts_hits_and_misses(self):
+        '''counts identity map hits and misses and reports them through "stats()".'''
+
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Hotel.find_by_id(hotel.id)
+        Hotel.all.get(7000)
+
+        stats = Hotel.all.stats()
+        assert ((stats["size"], stats["hits"], stats["misses"], stats["evictions"]) == (1, 1, 1, 0))
+
+    def test_unbounded(self):
+        '''keeps every object alive when created with maxsize=None.'''
+
+        Hotel.all = IdentityMap(maxsize=None)
+        Hotel.create_many([("Sonder", "545 Utica Avenue"), ("Jackal", "Jackal Lane"),
+                           ("Marketing", "Building B")])
+        gc.collect()
+
+        assert ((len(Hotel.all), Hotel.all.evictions) == (3, 0))
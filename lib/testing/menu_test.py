@@ -0,0 +1,18 @@
+import commands
+import pytest
+
+
+class TestMenu:
+    '''Function menu() in commands.py'''
+
+    def test_runs_actions_in_a_loop(self, monkeypatch):
+        '''runs the chosen actions one after the other without growing the call stack.'''
+        choices = iter(["4"] * 3000 + ["99", "15"])
+        shown = []
+        monkeypatch.setattr(commands, "display_menu", lambda: next(choices))
+        monkeypatch.setattr(commands, "page_hotels", lambda *args: shown.append(args))
+
+        with pytest.raises(SystemExit):
+            commands.menu()
+        assert (len(shown) == 3000)
+        assert (not commands._menu_running)
@@ -0,0 +1,80 @@
+from models import metrics
+from models.__init__ import CONN
+from models.connection import get_manager
+from models.hotel import Hotel
+import pytest
+import sqlite3
+import urllib.request
+
+
+class TestMetrics:
+    '''Metrics registry in metrics.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test, with empty metrics.'''
+        Hotel.drop_table()
+        Hotel.create_table()
+        Hotel.all.clear()
+        metrics.REGISTRY.reset()
+        yield
+        metrics.disable()
+        metrics.REGISTRY.reset()
+
+    def test_disabled_records_nothing(self):
+        '''records nothing until the registry is enabled.'''
+        Hotel.create("Sonder", "545 Utica Avenue")
+        Hotel.get_all()
+
+        assert (metrics.OPERATION_SECONDS.values == {})
+        assert (metrics.ROWS_HYDRATED.values == {})
+
+    def test_records_operations(self):
+        '''counts and times the model operations, the rows they hydrate and the commits.'''
+        metrics.enable()
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Hotel.create("Moxy", "485 7th Avenue")
+        Hotel.get_all()
+        Hotel.find_by_id(hotel.id)
+        with pytest.raises(ValueError):
+            hotel.update("", "545 Utica Avenue")
+
+        text = metrics.REGISTRY.render()
+        assert ('hotel_orm_operation_seconds_count{model="Hotel",operation="save"} 2' in text)
+        assert ('hotel_orm_operation_seconds_bucket{model="Hotel",operation="get_all",le="+Inf"} 1' in text)
+        assert ('hotel_orm_operation_errors_total{model="Hotel",operation="update"} 1' in text)
+        assert ('hotel_orm_rows_hydrated_total{model="Hotel"} 3' in text)
+        assert ('hotel_orm_identity_map_objects{model="Hotel"} 2' in text)
+        assert ("hotel_orm_commit_seconds_count 2" in text)
+        assert ("# TYPE hotel_orm_operation_seconds histogram" in text)
+
+    def test_counts_lock_failures(self):
+        '''counts the operations that fail on a database locked by another connection.'''
+        metrics.enable()
+        other = sqlite3.connect(get_manager().path)
+        other.execute("BEGIN IMMEDIATE")
+        CONN.execute("PRAGMA busy_timeout = 0")
+        try:
+            with pytest.raises(sqlite3.OperationalError):
+                Hotel.create("Sonder", "545 Utica Avenue")
+        finally:
+            CONN.execute(f"PRAGMA busy_timeout = {get_manager().pragmas['busy_timeout']}")
+            other.rollback()
+            other.close()
+
+        assert ('hotel_orm_lock_failures_total{model="Hotel",operation="save"} 1' in metrics.REGISTRY.render())
+
+    def test_exports(self, tmp_path):
+        '''writes the metrics to a file and serves them over HTTP.'''
+        metrics.enable()
+        Hotel.get_all()
+        path = tmp_path / "hotel.prom"
+        metrics.write_metrics(str(path))
+        assert ('operation="get_all"' in path.read_text())
+
+        server = metrics.serve_metrics(port=0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            assert (urllib.request.urlopen(url).read().decode() == metrics.REGISTRY.render())
+        finally:
+            server.shutdown()
@@ -0,0 +1,70 @@
+from models.__init__ import CURSOR
+from models.base import Model
+from models.hotel import Hotel
+import pytest
+
+
+class Room(Model):
+    table = "rooms"
+    columns = {
+        "number": "INT",
+        "hotel_id": "INT",
+    }
+    joins = {"hotel": Hotel}
+
+    def __init__(self, number, hotel_id, id=None):
+        self.id = id
+        self.number = number
+        self.hotel_id = hotel_id
+
+
+class TestModel:
+    '''Declarative base class Model in base.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Room.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Room.create_table()
+        Hotel.all.clear()
+        Room.all.clear()
+        yield
+        Room.drop_table()
+
+    def test_compiles_sql(self):
+        '''builds the CRUD statements of a subclass from its declared columns.'''
+
+        assert (" ".join(Room.sql["insert"].split()) == "INSERT INTO rooms (number, hotel_id) VALUES (?, ?)")
+        assert (" ".join(Room.sql["update"].split()) == "UPDATE rooms SET number = ?, hotel_id = ? WHERE id = ?")
+        columns = CURSOR.execute("PRAGMA table_info(rooms)").fetchall()
+        assert ([column[1] for column in columns] == ["id", "number", "hotel_id"])
+
+    def test_crud(self):
+        '''gives a subclass save, create_many, update, delete and the finders.'''
+
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        room = Room.create(101, hotel.id)
+        rooms = Room.create_many([(102, hotel.id), {"number": 103, "hotel_id": hotel.id}])
+
+        assert (Room.find_by_id(room.id) is room)
+        assert (Room.find_by("number", 103) is rooms[1])
+        assert (Room.get_all() == [room] + rooms)
+        assert (room.update(201, hotel.id) is room)
+        rooms[0].delete()
+        Room.all.clear()
+        assert (Room.find_by_id(room.id).number == 201)
+        assert (Room.ids() == {room.id, rooms[1].id})
+
+    def test_generated_readers(self):
+        '''generates the plain, records and joined row readers of a subclass.'''
+
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        room = Room.create(101, hotel.id)
+
+        assert (Room.get_all(records=True) == [(room.id, 101, hotel.id)])
+        assert (Room.get_all(records=True)[0].number == 101)
+        assert (Room.page(with_hotel=True)[0]._hotel is hotel)
+        with pytest.raises(TypeError):
+            Room.get_all(with_guests=True)
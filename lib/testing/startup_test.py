@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+
+LIB = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStartup:
+    '''Importing cli.py'''
+
+    def test_no_import_side_effects(self):
+        '''leaves the terminal, the database and the async and regex modules alone until they are needed.'''
+
+        script = ("import sys, cli, models.connection as c; "
+                  "print(sorted(m for m in ('asyncio', 'regex', 'concurrent.futures') if m in sys.modules), "
+                  "not vars(c._manager._local))")
+        result = subprocess.run([sys.executable, "-c", script], cwd=LIB, capture_output=True, text=True, check=True)
+
+        assert (result.stdout == "[] True\n")
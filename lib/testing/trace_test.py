@@ -0,0 +1,50 @@
+from models.connection import ConnectionManager
+from models.trace import SqlTrace, statement_shape
+import pytest
+
+
+class TestSqlTrace:
+    '''Class SqlTrace in trace.py'''
+
+    @pytest.fixture
+    def traced(self, tmp_path):
+        '''open a traced connection on a temporary database.'''
+        trace = SqlTrace(threshold=3)
+        manager = ConnectionManager(str(tmp_path / "hotel.db"), pragmas={}, factory=trace.connection_factory())
+        conn = manager.connection()
+        conn.execute("CREATE TABLE hotels (id INTEGER PRIMARY KEY, name TEXT)")
+        trace.reset()
+        yield trace, conn
+        manager.close_all()
+
+    def test_statement_shape(self):
+        '''replaces literals by ? and collapses whitespace.'''
+
+        assert (statement_shape("SELECT *\n  FROM hotels WHERE id = 12 AND name = 'It''s'") ==
+                "SELECT * FROM hotels WHERE id = ? AND name = ?")
+        assert (statement_shape("SAVEPOINT sp_1") == "SAVEPOINT sp_1")
+
+    def test_counts_statements_and_calls(self, traced):
+        '''counts every statement SQLite runs and times every execute call.'''
+        trace, conn = traced
+        conn.executemany("INSERT INTO hotels (name) VALUES (?)", [("Sonder",), ("Moxy",)])
+        conn.commit()
+        conn.cursor().execute("SELECT * FROM hotels").fetchall()
+
+        report = trace.report()
+        assert ((report["statements"], report["calls"]) == (5, 2))
+        assert (report["total_ms"] >= report["p95_ms"] > 0)
+        assert (report["repeated"] == [])
+
+    def test_warns_on_repeated_shapes(self, traced):
+        '''reports the shapes run more than threshold times as likely N+1 queries.'''
+        trace, conn = traced
+        for id in range(4):
+            conn.execute("SELECT * FROM hotels WHERE id = ?", (id,)).fetchone()
+
+        report = trace.report()
+        assert ([(shape, count) for shape, count, _ in report["repeated"]] == [("SELECT * FROM hotels WHERE id = ?", 4)])
+        assert (report["n_plus_one"] == ["SELECT * FROM hotels WHERE id = ?"])
+        assert ("WARNING: possible N+1 query" in trace.format_report("display-all-guests"))
+        trace.reset()
+        assert (trace.report()["calls"] == 0)
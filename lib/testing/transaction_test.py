@@ -0,0 +1,75 @@
+from models.__init__ import CONN, CURSOR
+from models.transaction import transaction
+from models.guest import Guest
+from models.hotel import Hotel
+import pytest
+
+
+class TestTransaction:
+    '''Function transaction() in transaction.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Guest.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Guest.create_table()
+        Hotel.all.clear()
+        Guest.all.clear()
+
+    def test_commits_once(self):
+        '''defers every write inside the block to a single commit when the block exits.'''
+
+        with transaction():
+            hotel = Hotel.create("Sonder", "545 Utica Avenue")
+            Guest.create("Raha", hotel.id)
+            assert (CONN.in_transaction)
+
+        assert (not CONN.in_transaction)
+        assert (len(Guest.get_all()) == 1)
+
+    def test_rolls_back_on_exception(self):
+        '''rolls back every write inside the block and forgets the saved objects when an exception is raised.'''
+
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        with pytest.raises(ValueError):
+            with transaction():
+                guest = Guest.create("Raha", hotel.id)
+                hotel.update("Jackal", "Jackal Lane")
+                Guest.create("Tal", 7000)
+
+        assert (CURSOR.execute("SELECT * FROM guests").fetchall() == [])
+        assert ((guest.id, len(Guest.all)) == (None, 0))
+        assert ((hotel.name, hotel.location) == ("Sonder", "545 Utica Avenue"))
+        assert (Hotel.find_by_id(hotel.id).name == "Sonder")
+
+    def test_nested_savepoint(self):
+        '''rolls back a nested block on its own and keeps the work of the enclosing block.'''
+
+        with transaction():
+            hotel = Hotel.create("Sonder", "545 Utica Avenue")
+            with pytest.raises(ValueError):
+                with transaction():
+                    Guest.create("Raha", hotel.id)
+                    hotel.delete("cascade")
+                    raise ValueError
+            assert (hotel.id is not None)
+            Guest.create("Tal", hotel.id)
+
+        assert ([guest.name for guest in Guest.get_all()] == ["Tal"])
+        assert (Hotel.all[hotel.id] is hotel)
+
+    def test_rolls_back_cascade(self):
+        '''restores the guests evicted by a cascading hotel delete when the block rolls back.'''
+
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        guest = Guest.create("Raha", hotel.id)
+        id = guest.id
+        with pytest.raises(ValueError):
+            with transaction():
+                hotel.delete("cascade")
+                raise ValueError
+
+        assert (guest.id == id and Guest.all[id] is guest)
+        assert (Guest.find_by_id(id) is guest)
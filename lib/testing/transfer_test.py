@@ -0,0 +1,110 @@
+from models.__init__ import CURSOR
+from models.guest import Guest
+from models.hotel import Hotel
+from models.search import DEFER_MIN_ROWS
+from transfer import export_rows, import_rows, open_text
+import gzip
+import io
+import json
+import pytest
+
+
+class TestImport:
+    '''Function import_rows() in transfer.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Guest.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Guest.create_table()
+        Hotel.all.clear()
+        Guest.all.clear()
+
+    def test_imports_csv(self):
+        '''imports the rows of a CSV file in chunks and rejects the invalid ones.'''
+        rows = io.StringIO("id,name,location\n3,Sonder,545 Utica Avenue\n,Jackal,Jackal Lane\n3,Moxy,Soho\n,,Soho\n")
+        errors = io.StringIO()
+
+        summary = import_rows(Hotel, rows, "csv", chunk_size=2, errors=errors)
+        assert ((summary["imported"], summary["rejected"]) == (2, 2))
+        assert (CURSOR.execute("SELECT * FROM hotels").fetchall() == [(3, "Sonder", "545 Utica Avenue"), (4, "Jackal", "Jackal Lane")])
+        assert ([json.loads(line)["line"] for line in errors.getvalue().splitlines()] == [5, 4])
+        assert (Hotel.search("sonder") == [Hotel.find_by_id(3)])
+
+    def test_imports_jsonl(self):
+        '''imports guests from JSON lines, checking their hotel ids without a query per row.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        lines = [json.dumps({"name": f"Guest {i}", "hotel_id": hotel.id}) for i in range(5)]
+        lines += [json.dumps({"name": "Raha", "hotel_id": 7000}), "[1, 2]", "not json"]
+        lines += [json.dumps({"name": "Tal", "hotel_id": hotel.id + 0.7}), json.dumps({"name": "Amir", "hotel_id": True})]
+
+        summary = import_rows(Guest, io.StringIO("\n".join(lines)), "jsonl", chunk_size=3)
+        assert ((summary["imported"], summary["rejected"]) == (5, 5))
+        assert (Hotel.guest_counts() == [(hotel, 5)])
+        assert (len(Guest.search("guest", limit=10)) == 5)
+
+    def test_indexes_large_chunks_at_once(self):
+        '''indexes chunks of DEFER_MIN_ROWS rows or more at once, smaller chunks through the trigger without a schema change.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        schema_version = CURSOR.execute("PRAGMA schema_version").fetchone()[0]
+        import_rows(Guest, io.StringIO("".join(f'{{"name": "Small {i}", "hotel_id": {hotel.id}}}\n' for i in range(3))), "jsonl")
+        assert (CURSOR.execute("PRAGMA schema_version").fetchone()[0] == schema_version)
+
+        lines = [json.dumps({"name": f"Large {i}", "hotel_id": hotel.id}) for i in range(DEFER_MIN_ROWS)]
+        import_rows(Guest, io.StringIO("\n".join(lines)), "jsonl")
+        assert (CURSOR.execute("PRAGMA schema_version").fetchone()[0] != schema_version)
+        assert ((len(Guest.search("small", limit=10)), len(Guest.search("large", limit=1000))) == (3, DEFER_MIN_ROWS))
+
+
+class TestExport:
+    '''Function export_rows() in transfer.py'''
+
+    @pytest.fixture(autouse=True)
+    def reset_db(self):
+        '''drop and recreate tables prior to each test.'''
+        Guest.drop_table()
+        Hotel.drop_table()
+        Hotel.create_table()
+        Guest.create_table()
+        Hotel.all.clear()
+        Guest.all.clear()
+
+    def test_exports_csv(self):
+        '''writes the rows of a table as CSV without loading model objects.'''
+        Hotel.create_many([("Sonder", "545 Utica Avenue"), ("Moxy", "Soho, New York")])
+        Hotel.all.clear()
+        out = io.StringIO()
+
+        assert (export_rows(Hotel, out, "csv", batch_size=1) == 2)
+        assert (out.getvalue() == 'id,name,location\r\n1,Sonder,545 Utica Avenue\r\n2,Moxy,"Soho, New York"\r\n')
+        assert (len(Hotel.all) == 0)
+
+    def test_exports_jsonl_with_hotel(self):
+        '''writes guests as JSON lines with the columns of their hotel, which imports back.'''
+        hotel = Hotel.create("Sonder", "545 Utica Avenue")
+        Guest.create("Raha", hotel.id)
+        out = io.StringIO()
+
+        assert (export_rows(Guest, out, "jsonl", with_hotel=True) == 1)
+        assert (json.loads(out.getvalue()) == {"id": 1, "name": "Raha", "hotel_id": 1,
+                                               "hotel_name": "Sonder", "hotel_location": "545 Utica Avenue"})
+        with pytest.raises(TypeError):
+            export_rows(Hotel, out, "jsonl", with_hotel=True)
+
+        Guest.drop_table()
+        Guest.create_table()
+        assert (import_rows(Guest, io.StringIO(out.getvalue()), "jsonl")["imported"] == 1)
+        assert (Guest.find_by_id(1).name == "Raha")
+
+    def test_gzip_round_trip(self, tmp_path):
+        '''compresses files ending in .gz and reads them back.'''
+        Hotel.create("Sonder", "545 Utica Avenue")
+        path = str(tmp_path / "hotels.csv.gz")
+        with open_text(path, "w") as out:
+            export_rows(Hotel, out, "csv")
+
+        assert (gzip.decompress(open(path, "rb").read()).decode() == "id,name,location\r\n1,Sonder,545 Utica Avenue\r\n")
+        with open_text(path) as rows:
+            assert (rows.read().startswith("id,name"))
@@ -0,0 +1,231 @@
+# lib/transfer.py
+
+"""Stream hotels and guests between the database and CSV or JSON lines files.
+
+Imports read the file row by row, validate every row without creating model
+objects and insert the valid rows in chunks, with one executemany and one
+transaction per chunk. Rejected rows are written to an error file as JSON lines.
+Exports write the rows of a cursor batch by batch, without creating model
+objects either, so memory use does not grow with the table."""
+
+import csv
+import gzip
+import io
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from models.cache import invalidating
+from models.connection import get_connection
+from models.guest import Guest
+from models.hotel import Hotel
+from models.search import deferred_search_index
+from models.transaction import transaction
+
+FORMATS = ("csv", "jsonl")
+
+# Size of the write buffer of exported files, and gzip level: 6 compresses
+# almost as well as the default 9 in a fraction of the time
+BUFFER_SIZE = 1 << 20
+GZIP_LEVEL = 6
+
+# Table name -> model, the tables that can be imported and exported
+MODELS = {
+    "hotels": Hotel,
+    "guests": Guest,
+}
+
+
+def detect_format(path, default="csv"):
+    """Return the file format implied by the extension of path, ignoring a trailing .gz"""
+    name = path[:-3] if path.endswith(".gz") else path
+    for fmt in FORMATS:
+        if name.endswith(f".{fmt}"):
+            return fmt
+    return default
+
+
+@contextmanager
+def open_text(path, mode="r", compress=None):
+    """ Open path as a text file for reading or writing, "-" being standard input or output.
+    The data is gzip (de)compressed when compress is True, or when it is None and path ends in .gz.
+    Standard streams are flushed but left open when the block exits"""
+    if compress is None:
+        compress = path.endswith(".gz")
+    standard = path == "-"
+    if standard:
+        binary = sys.stdin.buffer if mode == "r" else sys.stdout.buffer
+        if compress:
+            binary = gzip.GzipFile(fileobj=binary, mode=f"{mode}b", compresslevel=GZIP_LEVEL)
+    elif compress:
+        binary = gzip.open(path, f"{mode}b", compresslevel=GZIP_LEVEL)
+    else:
+        binary = open(path, f"{mode}b", buffering=BUFFER_SIZE)
+
+    text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+    try:
+        yield text
+    finally:
+        if standard:
+            text.flush()
+            text.detach()
+            if compress:
+                binary.close()
+        else:
+            text.close()
+
+
+def read_rows(file, fmt):
+    """Yield a (line number, record) pair per record of a CSV file with a header line, the record being a dictionary,
+    or per non-blank line of a JSON lines file, the record being the line, parsed by the caller"""
+    if fmt == "csv":
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_number, line in enumerate(file, start=1):
+        if line.strip():
+            yield line_number, line
+
+
+def parse_id(value):
+    """Return the integer id held by a CSV or JSON value, None when it is empty.
+    JSON numbers must be integers, 1.7 or true are rejected instead of read as 1"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return int(value)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"IDs must be whole numbers, not {value!r}")
+    return value
+
+
+def hotel_values(probe, row, hotel_ids):
+    """Return the (id, name, location) values of a hotel row, validated by the Hotel property setters"""
+    probe.name = row.get("name")
+    probe.location = row.get("location")
+    return (parse_id(row.get("id")),) + probe.row_values()
+
+
+def guest_values(probe, row, hotel_ids):
+    """Return the (id, name, hotel_id) values of a guest row. The hotel id is checked against hotel_ids"""
+    probe.name = row.get("name")
+    hotel_id = parse_id(row.get("hotel_id"))
+    if hotel_id not in hotel_ids:
+        raise ValueError("Hotel ID must reference a hotel in the database. Create the hotel first.")
+    probe._hotel_id = hotel_id
+    return (parse_id(row.get("id")),) + probe.row_values()
+
+
+ROW_VALUES = {
+    Hotel: hotel_values,
+    Guest: guest_values,
+}
+
+
+def insert_chunk(model, chunk, reject):
+    """ Insert the (line number, row, values) entries of chunk in one transaction and return the number inserted.
+    The search index is updated once for the whole chunk. When a row breaks a constraint the chunk
+    is retried row by row, each row in its own savepoint, so only the offending rows are rejected"""
+    sql = model.sql["insert_with_id"]
+    explicit_ids = [values[0] for _, _, values in chunk if values[0] is not None]
+    try:
+        with invalidating(model.table), deferred_search_index(model.table, model.search_columns, len(chunk)) as indexed_ids:
+            indexed_ids.extend(explicit_ids)
+            get_connection().executemany(sql, [values for _, _, values in chunk])
+        return len(chunk)
+    except sqlite3.IntegrityError:
+        pass
+
+    inserted = 0
+    with invalidating(model.table), deferred_search_index(model.table, model.search_columns, len(chunk)) as indexed_ids:
+        indexed_ids.extend(explicit_ids)
+        for line_number, row, values in chunk:
+            try:
+                with transaction():
+                    get_connection().execute(sql, values)
+                inserted += 1
+            except sqlite3.IntegrityError as error:
+                reject(line_number, row, error)
+    return inserted
+
+
+def import_rows(model, rows, fmt="csv", chunk_size=10000, errors=None, progress=None):
+    """ Import the records of rows, an iterable of CSV or JSON lines, into the table of model.
+    errors, when given, is a text file receiving one JSON line per rejected record.
+    progress, when given, is called with the summary so far after every chunk.
+    Return a summary dictionary with the imported and rejected counts and the elapsed seconds"""
+    summary = {"imported": 0, "rejected": 0, "seconds": 0.0}
+    hotel_ids = Hotel.ids() if model is Guest else set()
+    values_of = ROW_VALUES[model]
+    probe = model.__new__(model)
+    start = time.perf_counter()
+
+    def reject(line_number, row, error):
+        summary["rejected"] += 1
+        if errors is not None:
+            errors.write(json.dumps({"line": line_number, "error": str(error), "row": row}) + "\n")
+
+    def flush(chunk):
+        summary["imported"] += insert_chunk(model, chunk, reject)
+        summary["seconds"] = time.perf_counter() - start
+        if progress:
+            progress(summary)
+
+    chunk = []
+    for line_number, row in read_rows(rows, fmt):
+        try:
+            if fmt == "jsonl":
+                row = json.loads(row)
+                if not isinstance(row, dict):
+                    raise ValueError("every line must be a JSON object")
+            chunk.append((line_number, row, values_of(probe, row, hotel_ids)))
+        except (ValueError, TypeError) as error:
+            reject(line_number, row, error)
+            continue
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    flush(chunk)
+    return summary
+
+
+def export_rows(model, out, fmt="csv", batch_size=10000, **options):
+    """ Write every row of the table of model to the text file out as CSV with a header line or as JSON lines.
+    with_<name>=True adds the columns of a model declared in joins, named <name>_<column>.
+    Return the number of rows written"""
+    join = model.join_from_options(options)
+    header = ["id", *model.columns]
+    columns = [f"{model.table}.{column}" for column in header]
+    joined = ""
+    if join is not None:
+        related = model.joins[join]
+        header += [f"{join}_{column}" for column in related.columns]
+        columns += [f"{related.table}.{column}" for column in related.columns]
+        joined = f"LEFT JOIN {related.table} ON {related.table}.id = {model.table}.{join}_id"
+
+    # JSON lines are built by SQLite's json_object, one string per row
+    if fmt == "jsonl":
+        columns = ["json_object(" + ", ".join(f"'{name}', {column}" for name, column in zip(header, columns)) + ")"]
+
+    sql = f"""
+        SELECT {", ".join(columns)}
+        FROM {model.table}
+        {joined}
+        ORDER BY {model.table}.id
+    """
+
+    count = 0
+    cursor = get_connection().execute(sql)
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(header)
+        for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+            writer.writerows(rows)
+            count += len(rows)
+    else:
+        for rows in iter(lambda: cursor.fetchmany(batch_size), []):
+            out.write("".join(f"{line}\n" for line, in rows))
+            count += len(rows)
+    return count